@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of `callMethod` action dispatch in `process_message`.
+
+Run from the repository root:
+
+    python benchmarks/bench_dispatch.py
+"""
+
+import asyncio
+import time
+
+from meltree import inline
+from meltree.component import ComponentProxy
+from meltree.message import (
+    _parse_call_method_name,
+    call_method,
+    make_async,
+    parse_call_method_name,
+)
+
+
+class Counter:
+    template_path = "counter.html"
+    value = 0
+
+    def add(self, step):
+        self.value += step
+
+    @inline
+    def add_inline(self, step):
+        self.value += step
+
+
+async def legacy_dispatch(component, call_method_name):
+    """dispatch as done before dispatch tables: parse, getattr, wrap, call"""
+    method_name, params = _parse_call_method_name.__wrapped__(call_method_name)
+    if hasattr(component, method_name):
+        func = getattr(component, method_name)
+        if not asyncio.iscoroutinefunction(func):
+            func = make_async(func)
+        return await func(*params)
+
+
+async def table_dispatch(component, call_method_name):
+    method_name, params = parse_call_method_name(call_method_name)
+    return await call_method(component, method_name, params)
+
+
+async def measure(dispatch, component, call, rounds=5000):
+    for _ in range(100):
+        await dispatch(component, call)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await dispatch(component, call)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+async def main():
+    component = ComponentProxy(Counter())
+    for name, dispatch, call in (
+        ("legacy", legacy_dispatch, "add(1)"),
+        ("table, thread pool", table_dispatch, "add(1)"),
+        ("table, @inline", table_dispatch, "add_inline(1)"),
+    ):
+        print(f"{name:>20}: {await measure(dispatch, component, call):8.2f} µs/action")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
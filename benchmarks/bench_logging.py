@@ -0,0 +1,109 @@
+"""
+Event loop stall caused by per-message debug logging.
+
+A probe task measures how late its 1 ms sleeps wake up while another task
+handles messages which log like `meld_message` does, with debug logging on.
+Records go to a stream which blocks for 0.2 ms per write, like a busy
+terminal or pipe.
+
+Run from the repository root:
+
+    python benchmarks/bench_logging.py
+"""
+
+import io
+import time
+import queue
+import asyncio
+import logging
+import statistics
+from logging.handlers import QueueListener
+
+from meltree.logs import FORMAT, LazyQueueHandler, SampleFilter
+
+MESSAGES = 2000
+WRITE_DELAY = 0.0002
+
+
+class SlowStream(io.StringIO):
+    def write(self, text):
+        time.sleep(WRITE_DELAY)
+        return super().write(text)
+
+
+def stream_handler():
+    handler = logging.StreamHandler(SlowStream())
+    handler.setFormatter(logging.Formatter(FORMAT))
+    return handler
+
+
+async def workload(logger, eager):
+    attributes = {f"field_{i}": "value " * 4 for i in range(20)}
+    for i in range(MESSAGES):
+        if eager:
+            logger.debug("meld-message for %s: %s" % (i, attributes))
+            logger.debug("meld-message ready to send in session %s" % i)
+        else:
+            logger.debug("meld-message for %s: %s", i, attributes)
+            logger.debug("meld-message ready to send in session %s", i)
+        await asyncio.sleep(0)
+
+
+async def probe(lags, done):
+    loop = asyncio.get_running_loop()
+    while not done.is_set():
+        start = loop.time()
+        await asyncio.sleep(0.001)
+        lags.append(loop.time() - start - 0.001)
+
+
+async def measure(logger, eager):
+    lags = []
+    done = asyncio.Event()
+    probe_task = asyncio.ensure_future(probe(lags, done))
+    start = time.perf_counter()
+    await workload(logger, eager)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+    lags.sort()
+    return elapsed, lags
+
+
+def make_logger(name, handler, sample=1):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    logger.addFilter(SampleFilter(sample))
+    return logger
+
+
+def report(label, elapsed, lags):
+    p99 = lags[int(0.99 * (len(lags) - 1))] if lags else 0.0
+    median = statistics.median(lags) if lags else 0.0
+    print(
+        f"{label:<28} loop busy {elapsed * 1e3:8.1f} ms"
+        f"   lag p50 {median * 1e3:6.2f} ms"
+        f"   p99 {p99 * 1e3:6.2f} ms"
+        f"   max {(lags[-1] if lags else 0.0) * 1e3:6.2f} ms"
+    )
+
+
+def main():
+    handler = stream_handler()
+    logger = make_logger("bench.sync", handler)
+    report("sync handler, eager %", *asyncio.run(measure(logger, eager=True)))
+
+    for sample in (1, 10):
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, stream_handler())
+        listener.start()
+        logger = make_logger(f"bench.queue{sample}", LazyQueueHandler(records), sample)
+        elapsed, lags = asyncio.run(measure(logger, eager=False))
+        listener.stop()
+        report(f"queue handler, lazy, 1/{sample}", elapsed, lags)
+
+
+if __name__ == "__main__":
+    main()
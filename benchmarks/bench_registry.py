@@ -0,0 +1,43 @@
+"""
+Memory footprint of idle registered components.
+
+Run from the repository root:
+
+    python benchmarks/bench_registry.py
+"""
+import gc
+import tracemalloc
+
+from meltree import MelTree
+
+COMPONENTS = 10000
+
+
+class Widget:
+    template_path = "widget.html"
+    label = "widget"
+    value = 0
+
+
+def measure(register):
+    app = MelTree.func(app_name="bench")
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(COMPONENTS):
+        register(app, i)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / COMPONENTS
+
+
+def main():
+    for name, register in (
+        ("instance", lambda app, i: app.register_component(Widget(), cid=i)),
+        ("class (lazy)", lambda app, i: app.register_component(Widget, cid=i)),
+    ):
+        print(f"{name:>14}: {measure(register):7.1f} bytes/component")
+
+
+if __name__ == "__main__":
+    main()
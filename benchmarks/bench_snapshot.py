@@ -0,0 +1,64 @@
+"""
+Startup cost of component snapshots with 1k registered components.
+
+Run from the repository root:
+
+    python benchmarks/bench_snapshot.py
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from meltree.component import ComponentProxy
+from meltree.snapshot import SnapshotStore
+
+COMPONENTS = 1000
+
+
+class Form:
+    template_path = "form.html"
+
+    def __init__(self, i):
+        self.name = f"form {i}"
+        self.values = list(range(50))
+        self.notes = "lorem ipsum " * 20
+
+
+def make_components():
+    components = []
+    for i in range(COMPONENTS):
+        component = ComponentProxy(Form(i))
+        component.cid = f"Form:{i}"
+        components.append(component)
+    return components
+
+
+def main():
+    path = Path(tempfile.mkdtemp()) / "state.snap"
+    store = SnapshotStore(path)
+    for component in make_components():
+        store.save(component)
+    store.close()
+    print(f"snapshot file: {path.stat().st_size / 1024:.0f} KiB")
+
+    components = make_components()
+    start = time.perf_counter()
+    store = SnapshotStore(path)
+    index_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.restore(components[0])
+    first_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for component in components[1:]:
+        store.restore(component)
+    all_time = time.perf_counter() - start + first_time
+
+    print(f"startup (index scan): {index_time * 1e3:8.2f} ms")
+    print(f"first restore:        {first_time * 1e6:8.2f} µs")
+    print(f"eager restore of all: {all_time * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from meltree import MelTree, render_template, emit
 import components
 
-mt = MelTree()
+mt = MelTree(transports=["websocket"], ping_interval=60)
 
 calc = components.Calculator()
 mt.register_component(calc)
@@ -1,4 +1,5 @@
 from pathlib import Path
+from meltree import inline
 
 
 class Calculator(object):
@@ -20,6 +21,7 @@ class Calculator(object):
         "^": "**",
     }
 
+    @inline
     def btn_pressed(self, btn):
         # button presss actions. logic has flaws, but simple logic is good enough here
         if btn in ("c",):
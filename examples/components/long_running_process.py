@@ -1,6 +1,5 @@
-from meltree import emit
 import asyncio
-from meltree import MelTree
+from meltree import MelTree, background
 from pathlib import Path
 
 
@@ -8,6 +7,7 @@ class LongRunningProcess(object):
 
     template_path = Path(__file__).name.replace(".py", ".html")
 
+    @background
     async def start(self):
         app = MelTree()
         self.value = 0
@@ -16,10 +16,6 @@ class LongRunningProcess(object):
         while self.value < 100:
             await asyncio.sleep(sleep_time)
             self.value += step_size
-            await app.sio_server.emit(
-                "meld-event", {"event": "progress", "message": {"progress": self.value}}
-            )
+            await app.emit("progress", progress=self.value)
         await asyncio.sleep(5 * sleep_time)
-        await app.sio_server.emit(
-            "meld-event", {"event": "progress", "message": {"progress": 0}}
-        )
+        await app.emit("progress", progress=0)
@@ -3,4 +3,16 @@ from aiohttp_jinja2 import (
     render_template,
     render_string,
 )
-from .meltree import MelTree, MelTreeHTTP, emit, listen
+from .meltree import (
+    MelTree,
+    MelTreeHTTP,
+    MelTreeServer,
+    background,
+    bulk,
+    computed,
+    emit,
+    inline,
+    listen,
+    poll,
+    shared,
+)
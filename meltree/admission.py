@@ -0,0 +1,357 @@
+import time
+import heapq
+import asyncio
+import itertools
+from collections import Counter, deque
+
+# priority classes of inbound events, lower is more urgent
+INIT = 0
+CLICK = 1
+SYNC = 2
+EVENT = 3
+CLASS_NAMES = ("init", "click", "sync", "event")
+
+
+def classify(event, message):
+    """
+    Priority class of an inbound SocketIO event.
+
+    meld-message is classified by its most urgent action: `callMethod` from
+    element actions is a click, `callMethod` sent by a custom event listener
+    carries a `message` and is an event callback, `syncInput` is a sync.
+    """
+    if event == "meld-init":
+        return INIT
+    if event != "meld-message":
+        return CLICK
+
+    priority = EVENT
+    for action in message.get("actionQueue", ()):
+        if "callMethod" in action["type"]:
+            if "message" not in (action.get("payload") or {}):
+                return CLICK
+        elif "syncInput" in action["type"]:
+            priority = SYNC
+    return priority
+
+
+def merge_messages(into, message):
+    """
+    Coalesce meld-message `message` into the queued `into`. Of actions with
+    the same type and name only the latest is kept, e.g. the last value typed
+    into a field.
+    """
+    actions = into["actionQueue"]
+    for action in message["actionQueue"]:
+        key = (action["type"], (action.get("payload") or {}).get("name"))
+        actions[:] = [
+            a
+            for a in actions
+            if (a["type"], (a.get("payload") or {}).get("name")) != key
+        ]
+        actions.append(action)
+    into["data"] = message.get("data", into.get("data"))
+    into["renderDOM"] = into.get("renderDOM") or message.get("renderDOM")
+    if message.get("version") is not None:
+        into["version"] = message["version"]
+
+
+def stream_of(sid, event, message):
+    """
+    Messages of one session to one component, which are admitted in order.
+    """
+    if isinstance(message, dict):
+        return (sid, message.get("id"))
+    return (sid, message if event == "meld-init" else None)
+
+
+class TokenBucket(object):
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now):
+        """
+        Seconds until the next token is available.
+        """
+        missing = 1 - (self.tokens + (now - self.updated) * self.rate)
+        return max(0.0, missing / self.rate)
+
+
+class _Entry(object):
+    __slots__ = (
+        "priority",
+        "seq",
+        "sid",
+        "event",
+        "message",
+        "future",
+        "queued",
+        "key",
+        "stream",
+        "removed",
+    )
+
+    def __init__(self, priority, seq, sid, event, message, future, queued, key, stream):
+        self.priority = priority
+        self.seq = seq
+        self.sid = sid
+        self.event = event
+        self.message = message
+        self.future = future
+        self.queued = queued
+        self.key = key  # coalescing key, None if the entry can't be merged into
+        self.stream = stream
+        self.removed = False  # admitted or dropped, its heap item is stale
+
+
+class AdmissionController(object):
+    """
+    Admission of inbound SocketIO events before they are processed.
+
+    Every session has a token bucket refilled with `rate` tokens per second up
+    to `burst`, and each event takes one token. At most `max_inflight` events
+    are processed at once. Events which can't be admitted right away wait in a
+    queue by priority class: init > click > sync > event callbacks.
+    Priorities only apply between sessions and components: the events of one
+    session to one component are admitted in the order they arrived, at the
+    priority of the most urgent one waiting. A click waits for the syncs sent
+    before it, and takes them along ahead of less urgent events.
+
+    While waiting, a sync or event message is coalesced into a queued message
+    of the same class, session and component, if no other message of theirs
+    was queued after it, so only the latest values are processed. When
+    `max_queue` events wait, event callbacks are shed, the newest first.
+    Inits, clicks and syncs are never dropped.
+
+    Decisions are counted per class in `stats()`.
+
+    Attributes
+    ----------
+    rate :
+        tokens added to a session bucket per second.
+    burst :
+        size of a session bucket.
+    max_inflight :
+        number of events processed at once.
+    max_queue :
+        number of waiting events above which event callbacks are shed.
+    """
+
+    def __init__(self, rate=20.0, burst=40, max_inflight=16, max_queue=256):
+        self.rate = rate
+        self.burst = burst
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.inflight = 0
+        self.clock = time.monotonic
+        self._seq = itertools.count()
+        self._buckets = {}  # sid -> TokenBucket
+        self._streams = {}  # stream -> deque of waiting _Entry, in arrival order
+        self._heap = []  # (priority, seq, _Entry) of every waiting entry
+        self._waiting = 0
+        self._pending = {}  # (sid, cid, class) -> queued coalescable _Entry
+        self._timer = None
+        self.counters = {
+            name: Counter()
+            for name in ("admitted", "queued", "coalesced", "shed", "rate_limited")
+        }
+        self.wait_total = Counter()  # class -> seconds spent in the queue
+
+    def _bucket(self, sid, now):
+        bucket = self._buckets.get(sid)
+        if bucket is None:
+            bucket = self._buckets[sid] = TokenBucket(self.rate, self.burst, now)
+        return bucket
+
+    async def admit(self, sid, event, message):
+        """
+        Wait until `message` of `event` from session `sid` may be processed,
+        then count it as in flight until `release` is called.
+
+        Returns:
+            the message to process, which may have later messages merged in,
+            or None when it was shed or coalesced into another one.
+        """
+        priority = classify(event, message)
+        name = CLASS_NAMES[priority]
+        now = self.clock()
+        bucket = self._bucket(sid, now)
+
+        if not self._waiting and self.inflight < self.max_inflight:
+            if bucket.take(now):
+                self.inflight += 1
+                self.counters["admitted"][name] += 1
+                return message
+            self.counters["rate_limited"][name] += 1
+
+        stream = stream_of(sid, event, message)
+        key = None
+        if event == "meld-message" and priority >= SYNC:
+            key = (sid, message.get("id"), priority)
+            pending = self._pending.get(key)
+            if (
+                pending is not None
+                and not pending.future.done()
+                and pending is self._last(stream)
+            ):
+                merge_messages(pending.message, message)
+                self.counters["coalesced"][name] += 1
+                return None
+
+        if self._waiting >= self.max_queue:
+            if priority == EVENT:
+                self.counters["shed"][name] += 1
+                return None
+            events = [e for e in self._entries() if e.priority == EVENT]
+            if events:
+                self._drop(max(events, key=lambda e: e.seq))
+                self.counters["shed"][CLASS_NAMES[EVENT]] += 1
+
+        entry = _Entry(
+            priority,
+            next(self._seq),
+            sid,
+            event,
+            message,
+            asyncio.get_running_loop().create_future(),
+            now,
+            key,
+            stream,
+        )
+        self._streams.setdefault(stream, deque()).append(entry)
+        heapq.heappush(self._heap, (priority, entry.seq, entry))
+        self._waiting += 1
+        if key is not None:
+            self._pending[key] = entry
+        self.counters["queued"][name] += 1
+        self._schedule()
+        try:
+            return await entry.future
+        except asyncio.CancelledError:
+            if not entry.future.cancelled() and entry.future.result() is not None:
+                # admitted right before the handler was cancelled
+                self.release()
+            raise
+
+    def release(self):
+        """
+        Mark an admitted event as processed.
+        """
+        self.inflight -= 1
+        self._schedule()
+
+    def forget(self, sid):
+        """
+        Drop the bucket and the waiting events of a disconnected session.
+        """
+        self._buckets.pop(sid, None)
+        for entry in list(self._entries()):
+            if entry.sid == sid:
+                self._drop(entry)
+        self._schedule()
+
+    def _entries(self):
+        for entries in self._streams.values():
+            yield from entries
+
+    def _remove(self, entry):
+        # its heap item is skipped when it comes up
+        entries = self._streams[entry.stream]
+        entries.remove(entry)
+        if not entries:
+            del self._streams[entry.stream]
+        entry.removed = True
+        self._waiting -= 1
+        self._unpend(entry)
+
+    def _drop(self, entry):
+        self._remove(entry)
+        if not entry.future.done():
+            entry.future.set_result(None)
+
+    def _last(self, stream):
+        entries = self._streams.get(stream)
+        return entries[-1] if entries else None
+
+    def _unpend(self, entry):
+        if entry.key is not None and self._pending.get(entry.key) is entry:
+            del self._pending[entry.key]
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = self.clock()
+        wait = None
+        # items of streams whose session is out of tokens, pushed back after
+        blocked = []
+        tried = set()
+        while self._heap and self.inflight < self.max_inflight:
+            # streams are tried in the order of their most urgent entry, and
+            # admit their oldest entry while the session has a token
+            item = heapq.heappop(self._heap)
+            urgent = item[2]
+            if urgent.removed:
+                continue
+            if urgent.stream in tried:
+                blocked.append(item)
+                continue
+            entry = self._streams[urgent.stream][0]
+            if entry.future.done():
+                # its handler was cancelled
+                self._drop(entry)
+                if urgent is not entry:
+                    heapq.heappush(self._heap, item)
+                continue
+            bucket = self._bucket(entry.sid, now)
+            if bucket.take(now):
+                self._remove(entry)
+                if urgent is not entry:
+                    heapq.heappush(self._heap, item)
+                self.inflight += 1
+                name = CLASS_NAMES[entry.priority]
+                self.counters["admitted"][name] += 1
+                self.wait_total[name] += now - entry.queued
+                entry.future.set_result(entry.message)
+                continue
+            tried.add(urgent.stream)
+            blocked.append(item)
+            entry_wait = bucket.wait_time(now)
+            wait = entry_wait if wait is None else min(wait, entry_wait)
+
+        for item in blocked:
+            heapq.heappush(self._heap, item)
+        if wait is not None and self.inflight < self.max_inflight:
+            # every waiting session is out of tokens
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(wait, self._schedule)
+
+    def stats(self):
+        """
+        Counters of admission decisions per priority class, and current load.
+        """
+        return {
+            "inflight": self.inflight,
+            "queued_now": self._waiting,
+            "sessions": len(self._buckets),
+            **{name: dict(counter) for name, counter in self.counters.items()},
+            "wait_ms": {
+                name: 1e3 * total / self.counters["admitted"][name]
+                for name, total in self.wait_total.items()
+                if self.counters["admitted"][name]
+            },
+        }
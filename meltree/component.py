@@ -1,5 +1,6 @@
 import os
 import uuid
+from array import array
 from importlib.util import module_from_spec, spec_from_file_location
 from itertools import groupby
 from operator import itemgetter
@@ -11,6 +12,28 @@ from bs4.element import Tag
 from bs4.formatter import HTMLFormatter
 import jinja2
 from wrapt import ObjectProxy
+from meltree.profiler import profiler
+
+# maps memoryview format kinds to the names used by the client typed arrays
+BULK_KINDS = {
+    **dict.fromkeys("bhilq", "int"),
+    **dict.fromkeys("BHILQ?", "uint"),
+    **dict.fromkeys("efd", "float"),
+}
+
+
+def to_memoryview(value):
+    """
+    Expose `value` as a memoryview without copying it when possible.
+
+    Objects supporting the buffer protocol (bytes, `array.array`, NumPy arrays)
+    are viewed in place. Plain lists and tuples are packed as float64.
+    """
+    if isinstance(value, memoryview):
+        return value
+    if isinstance(value, (list, tuple)):
+        return memoryview(array("d", value))
+    return memoryview(value)
 
 
 class ComponentProxy(ObjectProxy):
@@ -19,17 +42,73 @@ class ComponentProxy(ObjectProxy):
     template context variable binding, template rendering and additional hooks.
     """
 
-    def __init__(self, obj, template_path=None, **kwargs):
+    # proxy state lives in fixed slots instead of the wrapped object
+    __slots__ = (
+        "_self_cid",
+        "_self_errors",
+        "_self_form",
+        "_self_template_path",
+        "_self_bulk_sent",
+        "_self_last_digest",
+    )
+
+    def __init__(self, obj, template_path=None, cid=None, **kwargs):
         self.__wrapped__ = obj
-        self.errors = {}
-        self._form = None
-        self.template_path = template_path or self.template_path
-        self.__dict__.update(**kwargs)
-        self.cid = f"{ self.__class__.__name__ }:{ uuid.uuid4() }"
+        self._self_cid = cid
+        self._self_errors = None
+        self._self_form = None
+        self._self_template_path = template_path
+        self._self_bulk_sent = None
+        self._self_last_digest = None
+        if kwargs:
+            self.__dict__.update(**kwargs)
 
         if hasattr(self, "form"):
             self._bind_form(kwargs)
 
+    @property
+    def cid(self):
+        if self._self_cid is None:
+            self._self_cid = f"{ self.__class__.__name__ }:{ uuid.uuid4() }"
+        return self._self_cid
+
+    @cid.setter
+    def cid(self, value):
+        self._self_cid = value
+
+    @property
+    def errors(self):
+        if self._self_errors is None:
+            self._self_errors = {}
+        return self._self_errors
+
+    @errors.setter
+    def errors(self, value):
+        self._self_errors = value
+
+    @property
+    def _form(self):
+        return self._self_form
+
+    @_form.setter
+    def _form(self, value):
+        self._self_form = value
+
+    @property
+    def last_digest(self):
+        """
+        Digest of the html of the last render, for any client.
+        """
+        return self._self_last_digest
+
+    @property
+    def template_path(self):
+        return self._self_template_path or self.__wrapped__.template_path
+
+    @template_path.setter
+    def template_path(self, value):
+        self._self_template_path = value
+
     def __repr__(self):
         return f"<meld.Component {self.__class__.__name__}>"
 
@@ -59,17 +138,92 @@ class ComponentProxy(ObjectProxy):
         Get attributes that can be called in the component.
         """
         attributes = {}
+        bulk_names = self._bulk_names()
+        shared_names = self._shared_names()
 
+        # errors live on the proxy, not on the wrapped object
         attributes_names = [
             attr
-            for attr in dir(self.__wrapped__)
-            if not callable(getattr(self, attr)) and not attr.startswith("_")
+            for attr in sorted({*dir(self.__wrapped__), "errors"})
+            if not attr.startswith("_")
+            and attr not in bulk_names
+            and attr not in shared_names
+            and not callable(getattr(self, attr))
         ]
         for name in attributes_names:
             attributes[name] = getattr(self, name)
 
         return attributes
 
+    def _bulk_names(self):
+        """
+        Names of the attributes declared with `@bulk` on the component class.
+        """
+        return getattr(self.__wrapped__, "_meld_bulk_attributes", ())
+
+    def _shared_names(self):
+        """
+        Attribute name to store key mapping of the `shared` attributes of the
+        component class.
+        """
+        return getattr(self.__wrapped__, "_meld_shared_attributes", {})
+
+    def _bulk_attributes(self):
+        """
+        Get bulk attributes of the component as memoryviews.
+        """
+        return {name: to_memoryview(getattr(self, name)) for name in self._bulk_names()}
+
+    def _bulk_changed(self):
+        """
+        Names of bulk attributes which were re-assigned since they were last sent.
+        The sent values are kept, so a new value can't reuse their `id()`.
+        """
+        sent = self._self_bulk_sent or {}
+        return [
+            name
+            for name in self._bulk_names()
+            if name not in sent or sent[name] is not getattr(self, name)
+        ]
+
+    def _bulk_chunks(self, chunk_size, names=None):
+        """
+        Yield the binary packets which transfer bulk attributes to the client.
+
+        Every bulk attribute is split into packets of at most `chunk_size` bytes.
+        Slicing happens on a memoryview, so only the chunk handed to socket.io
+        is ever copied.
+        """
+        if self._self_bulk_sent is None:
+            self._self_bulk_sent = {}
+
+        for name in self._bulk_names() if names is None else names:
+            value = getattr(self, name)
+            view = to_memoryview(value)
+            fmt = view.format.lstrip("@=<>!")
+            dtype = f"{BULK_KINDS.get(fmt, 'uint')}{view.itemsize * 8}"
+            try:
+                flat = view.cast("B")
+            except TypeError:
+                # non-contiguous or non-native views can only be sent as a copy
+                flat = memoryview(view.tobytes())
+            self._self_bulk_sent[name] = value
+
+            offset = 0
+            while True:
+                yield {
+                    "id": str(self.cid),
+                    "name": name,
+                    "dtype": dtype,
+                    "shape": list(view.shape),
+                    "nbytes": view.nbytes,
+                    "offset": offset,
+                    "chunk": bytes(flat[offset : offset + chunk_size]),
+                }
+                offset += chunk_size
+                if offset >= view.nbytes:
+                    break
+
     def _functions(self):
         """
         Get methods that can be called in the component.
@@ -109,32 +263,66 @@ class ComponentProxy(ObjectProxy):
         template = env.from_string(f_str)
         return template.render(**context_variables)
 
-    def render(self):
-        data = self._attributes()
-        context = self.__context__()
+    def render(self, client_digest=None):
+        """
+        Render the component html.
+
+        The digest of the template output is set as the `meld:digest` attribute
+        of the root element. Clients send back the digest of the html they
+        show, and when it equals `client_digest` None is returned instead.
+        Values of `meld:model` fields are set after the comparison, since
+        clients already show the values they synced.
+        """
+        obj = self.__wrapped__
+        with profiler.section(obj, "serialize"):
+            data = self._attributes()
+            context = self.__context__()
         context_variables = {}
         context_variables.update(context["attributes"])
         context_variables.update(context["methods"])
+        context_variables.update(
+            {name: getattr(self, name) for name in self._bulk_names()}
+        )
+        context_variables.update(
+            {name: getattr(self, name) for name in self._shared_names()}
+        )
         context_variables.update({"form": self._form})
 
         template_path = Path(os.getcwd()) / "templates/meltree" / self.template_path
         component_name = self.__class__.__name__
-        rendered_template = self._render_template(str(template_path), context_variables)
-
-        soup = BeautifulSoup(rendered_template, features="html.parser")
-        root_element = self._get_root_element(soup)
-        root_element["meld:id"] = str(self.cid)
-        self._set_values(root_element, context_variables)
-
-        script = soup.new_tag("script", type="module")
-        init = {"id": str(self.cid), "name": component_name, "data": data}
-        init_json = orjson.dumps(init).decode("utf-8")
-
-        meld_import = 'import {Meld} from "/meltree_static/meld.js";'
-        script.string = f"{meld_import} Meld.componentInit({init_json});"
-        root_element.append(script)
-
-        rendered_template = self._desoupify(soup)
+        with profiler.section(obj, "render_template"):
+            rendered_template = self._render_template(
+                str(template_path), context_variables
+            )
+        digest = format(hash(rendered_template) & 0xFFFFFFFFFFFFFFFF, "x")
+        self._self_last_digest = digest
+        if digest == client_digest:
+            return None
+
+        with profiler.section(obj, "soup"):
+            soup = BeautifulSoup(rendered_template, features="html.parser")
+            root_element = self._get_root_element(soup)
+            root_element["meld:id"] = str(self.cid)
+            root_element["meld:digest"] = digest
+            self._set_values(root_element, context_variables)
+
+        with profiler.section(obj, "serialize"):
+            init = {
+                "id": str(self.cid),
+                "name": component_name,
+                "data": data,
+                "bulk": list(self._bulk_names()),
+                "shared": self._shared_names(),
+            }
+            init_json = orjson.dumps(init).decode("utf-8")
+
+        with profiler.section(obj, "soup"):
+            script = soup.new_tag("script", type="module")
+            meld_import = 'import {Meld} from "/meltree_static/meld.js";'
+            script.string = f"{meld_import} Meld.componentInit({init_json});"
+            root_element.append(script)
+
+            rendered_template = self._desoupify(soup)
 
         return rendered_template
 
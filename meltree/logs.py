@@ -0,0 +1,132 @@
+import time
+import queue
+import atexit
+import logging
+import itertools
+from logging.handlers import QueueHandler, QueueListener
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_queue_handler = None
+_listener = None
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue handler leaving records unformatted, so `%` arguments are formatted
+    by the listener thread instead of the thread logging them. Arguments are
+    formatted when the record is written, mutable ones may show later values.
+
+    With `defer_to_root`, records go to the handlers of the root logger
+    instead whenever it has some, as if they propagated.
+    """
+
+    def __init__(self, queue, defer_to_root=False):
+        super().__init__(queue)
+        self.defer_to_root = defer_to_root
+
+    def prepare(self, record):
+        return record
+
+    def handle(self, record):
+        if self.defer_to_root:
+            root = logging.getLogger()
+            if root.handlers:
+                # checked per record: applications often configure logging
+                # after their MelTree app was created
+                root.callHandlers(record)
+                return True
+        return super().handle(record)
+
+
+def queue_handler(handlers=None):
+    """
+    Get the process wide handler queueing records for a background thread,
+    which writes them to `handlers` (a stream handler on stderr by default).
+    `handlers` are only used by the first call.
+    """
+    global _queue_handler, _listener
+    if _queue_handler is None:
+        if not handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter(FORMAT))
+            handlers = [handler]
+        records = queue.SimpleQueue()
+        _listener = QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        _queue_handler = LazyQueueHandler(records, defer_to_root=True)
+    return _queue_handler
+
+
+def setup_logger(name, handlers=None, level=logging.INFO):
+    """
+    Logger `name` writing through the queue handler. Whenever the application
+    has configured logging itself, i.e. the root logger has handlers, records
+    are handled by them instead, see `LazyQueueHandler`. Loggers given
+    handlers by the application are left as they are.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        logger.addHandler(queue_handler(handlers))
+        logger.propagate = False
+    if logger.level == logging.NOTSET:
+        logger.setLevel(level)
+    return logger
+
+
+class SampleFilter(logging.Filter):
+    """
+    Pass one record out of every `rate`.
+    """
+
+    def __init__(self, rate=1):
+        super().__init__()
+        self.rate = rate
+        self._count = itertools.count()
+
+    def filter(self, record):
+        return self.rate <= 1 or next(self._count) % self.rate == 0
+
+
+def sample_logger(logger, rate=1):
+    """
+    Pass one record of `logger` out of every `rate`. Loggers are shared by
+    every app constructed with the same name, so the filter of a previous
+    call is replaced instead of adding another one.
+    """
+    for existing in list(logger.filters):
+        if isinstance(existing, SampleFilter):
+            logger.removeFilter(existing)
+    sample = SampleFilter(rate)
+    logger.addFilter(sample)
+    return sample
+
+
+class RateLimiter(object):
+    """
+    Allow an event once per `interval` seconds for each key.
+
+    Calling it with a key returns None while the key is limited, otherwise
+    the number of events suppressed since it was last allowed.
+    """
+
+    def __init__(self, interval=60.0, max_keys=1024):
+        self.interval = interval
+        self.max_keys = max_keys
+        self._keys = {}  # key -> [allowed at, suppressed]
+
+    def __call__(self, key):
+        now = time.monotonic()
+        state = self._keys.get(key)
+        if state is not None and now - state[0] < self.interval:
+            state[1] += 1
+            return None
+        if state is None and len(self._keys) >= self.max_keys:
+            # forget keys which aren't limited anymore
+            self._keys = {
+                k: s for k, s in self._keys.items() if now - s[0] < self.interval
+            }
+        suppressed = state[1] if state is not None else 0
+        self._keys[key] = [now, 0]
+        return suppressed
@@ -1,27 +1,57 @@
 import os
+import json
+import time
+import signal
+import inspect
 import logging
+import threading
+import concurrent.futures
+import orjson
 import socketio
 import aiohttp
 import asyncio
 from uuid import uuid4
 from pathlib import Path
 
+from types import MethodType
 from functools import partial
 from meltree.tag import MeldTag
-from meltree.message import process_message
+from meltree.message import process_message, get_dispatch_table
+from meltree.snapshot import SnapshotStore
+from meltree.recorder import TrafficRecorder
+from meltree.profiler import profiler
+from meltree.tasks import TaskScheduler, PRIORITIES, INTERACTIVE
+from meltree.admission import AdmissionController
+from meltree.poll import Poller
+from meltree.store import Store
+from meltree.logs import setup_logger, sample_logger, RateLimiter
+from meltree.startup import (
+    StartupTimeline,
+    bind_socket,
+    show_eel,
+    SPLASH,
+    SPLASH_PATH,
+    READY_PATH,
+)
 from jinja2 import FileSystemLoader
+from markupsafe import Markup, escape
 
 from aiohttp_jinja2 import (
     template,
+    get_env,
     setup as aio_jinja_setup,
 )
 from meltree.component import ComponentProxy
 
+# concurrent `emit` calls sent at once per app
+EMIT_LIMIT = 64
+
 
 class memoized(object):
-    """Decorator that caches a function's return value each time it is called.
-    If called later with the same arguments, the cached value is returned, and
-    not re-evaluated.
+    """Registry of app instances: calling it returns the instance already built
+    for `app_name`, or builds and keeps a new one. Other arguments are only
+    used when the instance is built; passing them for an existing instance
+    raises ValueError, since they would be ignored.
     """
 
     def __init__(self, func):
@@ -29,17 +59,18 @@ class memoized(object):
         self.cache = {}
 
     def __call__(self, app_name="MelTree", *args, **kwargs):
-        key = tuple(app_name, *args)
         try:
-            return self.cache[key]
+            value = self.cache[app_name]
         except KeyError:
-            value = self.func(*args, **kwargs)
-            self.cache[key] = value
+            value = self.func(app_name, *args, **kwargs)
+            self.cache[app_name] = value
             return value
-        except TypeError:
-            # uncachable -- for instance, passing a list as an argument.
-            # Better to not cache than to blow up entirely.
-            return self.func(*args, **kwargs)
+        if args or kwargs:
+            raise ValueError(
+                f"app {app_name!r} already exists, its options can only be "
+                "given when it is first created"
+            )
+        return value
 
     def __repr__(self):
         """Return the function's docstring."""
@@ -60,26 +91,27 @@ class MelTreeHTTP(object):
         logger instance.
     http_server :
         AIOHTTP HTTP Server class
+    startup :
+        `StartupTimeline` of `run`, None until the app runs.
     """
 
     http_server = None
     http_routes = None
     logger = None
+    startup = None
+    port = None
+    ready_timeout = 10
+    _launch_task = None
+    _prepared = False
     _name = None
     __cache = {}
 
-    def __init__(self, app_name="MelTree", *args, **kwargs):
+    def __init__(self, app_name="MelTree", *args, log_handlers=None, **kwargs):
         self._name = app_name
         self._gen_http_srv()
 
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            handlers=[
-                logging.StreamHandler(),
-            ],
-        )
-        self.logger = logging.getLogger(name=app_name)
+        # records are written by a background thread, not the event loop
+        self.logger = setup_logger(app_name, handlers=log_handlers)
 
     def get(self, path, **kwargs):
         """
@@ -129,6 +161,79 @@ class MelTreeHTTP(object):
         """
         self.http_routes.static(prefix, path, **kwargs)
 
+    def add_profiler_route(self, path="/_meltree/profiler"):
+        """
+        Expose the component profiler on `path`. only add it on apps which are
+        not reachable by untrusted clients.
+
+        - GET returns the profiler status.
+        - POST starts profiling. optional query parameters: `classes` and
+          `sections` (comma separated), `duration` (seconds) and `mode`
+          (`cprofile` or `sampling`).
+        - DELETE stops profiling and returns the dump.
+        """
+
+        @self.get(path)
+        async def profiler_status(request):
+            return aiohttp.web.json_response(profiler.status())
+
+        @self.post(path)
+        async def profiler_start(request):
+            query = request.query
+            try:
+                profiler.start(
+                    classes=_split_query(query.get("classes")),
+                    sections=_split_query(query.get("sections")),
+                    duration=float(query["duration"]) if "duration" in query else None,
+                    mode=query.get("mode", "cprofile"),
+                )
+            except (ValueError, RuntimeError) as e:
+                raise aiohttp.web.HTTPBadRequest(text=str(e))
+            return aiohttp.web.json_response(profiler.status())
+
+        @self.delete(path)
+        async def profiler_stop(request):
+            dump_path = profiler.stop()
+            if dump_path is None:
+                raise aiohttp.web.HTTPConflict(text="profiler is not running")
+            return aiohttp.web.FileResponse(dump_path)
+
+    def add_profiler_signal(self, signum=getattr(signal, "SIGUSR1", None), **kwargs):
+        """
+        Toggle the component profiler with a signal, e.g. `kill -USR1 <pid>`.
+        keyword arguments are passed to `profiler.start`; dumps are written to
+        the working directory.
+
+        The signal is handled on the event loop once the server runs, and the
+        dump is written by a worker thread. Raises ValueError where the signal
+        doesn't exist, e.g. SIGUSR1 on Windows.
+        """
+        if signum is None:
+            raise ValueError(
+                "profiler signal is not available on this platform, "
+                "use add_profiler_route instead"
+            )
+
+        async def stop():
+            path = await asyncio.get_running_loop().run_in_executor(None, profiler.stop)
+            self.logger.info("profile written to %s", path)
+
+        def toggle():
+            if profiler.active:
+                asyncio.ensure_future(stop())
+            else:
+                profiler.start(**kwargs)
+                self.logger.info("profiler started")
+
+        async def add_handler(app):
+            asyncio.get_running_loop().add_signal_handler(signum, toggle)
+
+        async def remove_handler(app):
+            asyncio.get_running_loop().remove_signal_handler(signum)
+
+        self.http_server.on_startup.append(add_handler)
+        self.http_server.on_cleanup.append(remove_handler)
+
     def _gen_http_srv(self):
         """
         called on object init. creates AIOHTTP web application and configures it
@@ -146,53 +251,266 @@ class MelTreeHTTP(object):
             extensions=[MeldTag(self)],
         )
 
-    def run(self, log_level=None, presenter=("eel",)):
+    def run(
+        self,
+        log_level=None,
+        presenter=("eel",),
+        host=None,
+        port=8080,
+        size=(300, 500),
+        prewarm=True,
+    ):
         """
         Run this object as a web application.
 
+        The socket is bound before anything else, then the presenter is
+        launched on a splash page while templates and components are warmed
+        up. The splash switches to the app page once `/_meltree/ready`
+        answers. Startup milestones are logged, see `startup`.
+
         Parameters
         ----------
         log_level : int
             logging log level items
         presenter : list[str]
             list of viewers to try loading the gui
+        host : str
+            interface to listen on. all interfaces if None.
+        port : int
+            port to listen on. 0 picks a free port.
+        size : tuple[int, int]
+            presenter window size.
+        prewarm : bool
+            compile templates and build component dispatch tables before
+            reporting ready.
         """
         self.log_level = log_level
         if log_level is not None:
             self.logger.setLevel(log_level)
 
+        sock = self.prepare(
+            presenter=presenter, host=host, port=port, size=size, prewarm=prewarm
+        )
+        aiohttp.web.run_app(self.http_server, sock=sock)
+
+    def prepare(
+        self, presenter=(), host=None, port=8080, size=(300, 500), prewarm=True
+    ):
+        """
+        Bind the server socket and add the routes and startup hooks used by
+        `run`. Returns the listening socket. Can only be called once.
+        """
+        if self._prepared:
+            raise RuntimeError("the server was already prepared")
+        self._prepared = True
+        if self.startup is None:
+            self.startup = StartupTimeline(self.logger)
+        sock = bind_socket(host, port)
+        self.port = sock.getsockname()[1]
+        self.startup.mark(f"socket bound on port {self.port}")
+
         self.http_server.add_routes(self.http_routes)
-        presenter = presenter or []
+        self.http_server.router.add_get(SPLASH_PATH, self._splash)
+        self.http_server.router.add_get(READY_PATH, self._ready)
+        self.http_server.on_startup.append(
+            partial(
+                self._launch,
+                presenter=presenter or [],
+                host=host or "localhost",
+                size=size,
+                prewarm=prewarm,
+            )
+        )
+        self.http_server.on_cleanup.append(self._stop_launch)
+        return sock
+
+    async def _launch(self, app, presenter, host, size, prewarm):
+        """
+        Start the presenter and the prewarm concurrently, without delaying the
+        server start.
+        """
+        self.startup.mark("server starting")
+        self._ready_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        jobs = []
         if "eel" in presenter:
-            try:
-                import eel
+            jobs.append(
+                self._show(loop.run_in_executor(None, show_eel, host, self.port, size))
+            )
+        if prewarm:
+            jobs.append(self.prewarm())
+        self._launch_task = loop.create_task(self._wait_ready(jobs))
+
+    async def _show(self, launched):
+        try:
+            await launched
+            self.startup.mark("presenter launched")
+        except Exception as e:
+            self.logger.exception(e)
 
-                # open browser. we have to make a small hack into eel
-                # and prevent it's local web server running
-                eel._start_args.update({"size": (300, 500), "port": 8080})
-                eel.show("")
-            except Exception as e:
-                self.logger.exception(e)
+    async def _wait_ready(self, jobs):
+        for result in await asyncio.gather(*jobs, return_exceptions=True):
+            if isinstance(result, Exception):
+                self.logger.error("startup job failed", exc_info=result)
+        self._ready_event.set()
+        self.startup.mark("ready")
 
-        aiohttp.web.run_app(self.http_server)
+    async def _stop_launch(self, app):
+        if self._launch_task is not None:
+            self._launch_task.cancel()
+            await asyncio.gather(self._launch_task, return_exceptions=True)
+
+    async def _splash(self, request):
+        return aiohttp.web.Response(text=SPLASH, content_type="text/html")
+
+    async def _ready(self, request):
+        """
+        Long poll answering 200 once the app is ready, or 503 after
+        `ready_timeout` seconds so the splash asks again.
+        """
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(self._ready_event.wait()), self.ready_timeout
+            )
+        except asyncio.TimeoutError:
+            raise aiohttp.web.HTTPServiceUnavailable()
+        return aiohttp.web.json_response(self.startup.summary())
+
+    async def prewarm(self):
+        """
+        Load and compile every template in a worker thread.
+        """
+        env = get_env(self.http_server)
+
+        def compile_templates():
+            count = 0
+            for name in env.list_templates(extensions=("html", "htm", "jinja2")):
+                try:
+                    env.get_template(name)
+                    count += 1
+                except Exception:
+                    self.logger.exception("template %s failed to compile", name)
+            return count
+
+        count = await asyncio.get_running_loop().run_in_executor(
+            None, compile_templates
+        )
+        self.startup.mark(f"{count} templates compiled")
 
 
 class MelTree(MelTreeHTTP):
     """
     MelTree object to use for generating the gui
+
+    Parameters
+    ----------
+    transports : list[str]
+        SocketIO transports allowed on both server and client. use
+        `["websocket"]` in local webviews to skip the long-polling handshake.
+        defaults to long-polling upgraded to websocket.
+    ping_interval : int
+        seconds between SocketIO pings. raise it so idle desktop windows
+        don't wake up the server.
+    ping_timeout : int
+        seconds to wait for a ping answer before the client is disconnected.
+    snapshot_path : str
+        file to persist component attributes in. components registered with an
+        explicit `cid` get their attributes back on first use after a restart.
+    record_path : str
+        file to record inbound meld-init/meld-message events in, for replaying
+        them with `python -m meltree.replay`.
+    server : MelTreeServer
+        shared server to mount the app on, under `/<app_name>/` with its own
+        SocketIO namespace. SocketIO options are then taken from the server.
+    task_limit : int
+        number of `@background` methods of one component class running at
+        once. more are queued by priority. see `tasks`.
+    admission : AdmissionController
+        rate limits and priorities of inbound events, see `AdmissionController`.
+        a default one is created if None.
+    log_handlers : list[logging.Handler]
+        handlers the background logging thread writes to, stderr by default.
+        unused when the application configured the root logger itself.
+    log_sample : int
+        log one in every `log_sample` per-message debug records.
+    session_grace : float
+        seconds a disconnected session can be resumed for.
     """
 
     sio_server = None
+    server = None
+    namespace = "/"
     sid = None
+    bulk_chunk_size = 64 * 1024
     _components = None
+    _object_cids = None
+    _sessions = None
 
-    def __init__(self, app_name="MelTree", *args, **kwargs):
-        super(BaseComponents.MelTree, self).__init__(app_name=app_name)
+    def __init__(
+        self,
+        app_name="MelTree",
+        *args,
+        transports=None,
+        ping_interval=25,
+        ping_timeout=20,
+        snapshot_path=None,
+        record_path=None,
+        server=None,
+        task_limit=4,
+        admission=None,
+        log_handlers=None,
+        log_sample=1,
+        session_grace=60,
+        **kwargs,
+    ):
+        super(BaseComponents.MelTree, self).__init__(
+            app_name=app_name, log_handlers=log_handlers
+        )
+        # per-message debug records, sampled
+        self.message_logger = self.logger.getChild("messages")
+        sample_logger(self.message_logger, log_sample)
+        self._miss_limiter = RateLimiter()
+        if server is not None:
+            self.server = server
+            self.namespace = f"/{app_name}"
+            transports = server.transports
+            ping_interval = server.ping_interval
+            ping_timeout = server.ping_timeout
+        self.transports = list(transports) if transports else None
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.tasks = TaskScheduler(
+            limit=task_limit, logger=self.logger, on_done=self._task_done
+        )
+        # emits are short socket writes, they don't wait for component tasks
+        self.tasks.set_limit("emit", EMIT_LIMIT)
+        self._early_emits = []  # (event name, kwargs, future) before startup
+        self._emit_lock = threading.Lock()
+        self.admission = admission or AdmissionController()
+        self.poller = Poller(self, logger=self.logger)
+        self.store = Store(on_change=self._shared_changed)
+        self._shared_published = {}  # key -> last version sent to clients
         self._gen_sio_srv()
         self._components = {}
-        self.sio_server.attach(self.http_server)
+        self._object_cids = {}
+        self.session_grace = session_grace
+        # token -> time its session expires, None while connected
+        self._sessions = {}
+        self._session_tokens = {}  # sid -> token
+        self._snapshots = None
+        if snapshot_path is not None:
+            self._snapshots = SnapshotStore(snapshot_path, logger=self.logger)
+        self._recorder = None
+        if record_path is not None:
+            self._recorder = TrafficRecorder(record_path)
+        if self.server is None:
+            self.sio_server.attach(self.http_server)
+        else:
+            self.server.mount(self)
         self.loop = asyncio.get_event_loop()
+        get_env(self.http_server).globals["meltree_options"] = self.client_options
 
+        self.http_server.on_startup.append(self.on_startup)
         self.http_server.on_shutdown.append(self.on_shutdown)
 
     def emit(self, event_name: str, **kwargs):
@@ -205,60 +523,292 @@ class MelTree(MelTreeHTTP):
             event_name (str): The name of the custom event to emit.
             **kwargs: Arguments to be passed as keyword arguments to the listening
                 methods.
+
+        Safe to call from the event loop and from any thread. Returns the
+        future of the emit, see `TaskScheduler.submit`. Events emitted from a
+        thread before the server started are sent once it starts.
         """
+        with self._emit_lock:
+            if self.tasks.loop is None and not _loop_running():
+                future = concurrent.futures.Future()
+                self._early_emits.append((event_name, kwargs, future))
+                return future
+        return self._submit_emit(event_name, kwargs)
 
-        async def _emit():
-            await sio_server.emit(
-                "meld-event", {"event": event_name, "message": kwargs}
-            )
+    def _submit_emit(self, event_name, kwargs):
+        return self.tasks.submit(
+            self.sio_server.emit,
+            ("meld-event", {"event": event_name, "message": kwargs}),
+            {"namespace": self.namespace},
+            key="emit",
+            priority=INTERACTIVE,
+            name=f"emit {event_name}",
+        )
+
+    def add_admission_route(self, path="/_meltree/admission"):
+        """
+        Expose the counters of admission decisions on `path` as JSON.
+        """
+
+        @self.get(path)
+        async def admission_stats(request):
+            return aiohttp.web.json_response(self.admission.stats())
 
-        sio_server = self.sio_server
-        self.loop.call_soon_threadsafe(_emit)
+    def client_options(self):
+        """
+        `<meta>` tag passing connection options to the client scripts.
+        Available in templates as `{{ meltree_options() }}`, it has to be placed
+        before the meld.js module is imported.
+        """
+        options = {
+            "namespace": self.namespace,
+            "transports": self.transports,
+            "upgrade": self.transports != ["websocket"],
+        }
+        content = escape(json.dumps(options))
+        return Markup(f'<meta name="meltree-options" content="{content}">')
 
     def on_event(self, event, handler=None, namespace=None):
         """
-        listen for SocketIO `event` name
+        listen for SocketIO `event` name, in the app namespace by default
         """
-        return self.sio_server.on(event=event, handler=handler, namespace=namespace)
+        return self.sio_server.on(
+            event=event, handler=handler, namespace=namespace or self.namespace
+        )
 
     def get_component(self, cid):
         """
-        Get a component class based on a component name.
+        Get a registered component by its cid, or by `id()` of a registered object.
+        Components registered by class or factory are constructed on first use.
         """
+        if type(cid) is int:
+            cid = self._object_cids.get(cid, cid)
         try:
-            return self._components[cid]
+            component = self._components[cid]
         except KeyError as err:
-            self.logger.exception(err)
+            suppressed = self._miss_limiter(cid)
+            if suppressed is not None:
+                self.logger.exception(
+                    "component %s not found, %s misses suppressed", err, suppressed
+                )
+            return None
+
+        if not isinstance(component, ComponentProxy):
+            component = ComponentProxy(component(), cid=cid)
+            self._components[cid] = component
+            self._object_cids[id(component.__wrapped__)] = cid
+            self._subscribe_shared(component)
+
+        if self._snapshots is not None:
+            self._snapshots.restore(component)
+        return component
 
     def register_component(self, obj, cid=None):
-        component = ComponentProxy(obj)
+        """
+        Register a component and return its cid.
 
+        `obj` can be a component instance, or a component class or factory
+        function which is called without arguments the first time the component
+        is requested (by `get_component` or `{% meld cid %}` in a template).
+        Idle lazy components only cost their entry in the components table.
+        """
+        lazy = isinstance(obj, type) or inspect.isfunction(obj)
+        name = obj.__name__ if lazy else obj.__class__.__name__
         if cid is None:
             cid = uuid4()
-        cid = f"{ obj.__class__.__name__ }:{ cid }"
-        component.cid = cid
+        cid = f"{ name }:{ cid }"
+
+        if lazy:
+            self._components[cid] = obj
+        else:
+            self._components[cid] = ComponentProxy(obj, cid=cid)
+            self._object_cids[id(obj)] = cid
+            self._subscribe_shared(self._components[cid])
+        return cid
+
+    def _subscribe_shared(self, component):
+        """
+        Bind the `shared` attributes of `component` to the store of this app.
+        """
+        names = component._shared_names()
+        if not names:
+            return
+        component.__wrapped__.__dict__["_meld_store"] = self.store
+        for key in names.values():
+            self.store.subscribe(key, component.cid)
+
+    def _shared_changed(self, key, version):
+        """
+        Publish a changed store key, from any thread. Changes made before the
+        app serves are sent when clients subscribe.
+        """
+        if self.tasks.loop is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return
+        self.tasks.submit(
+            self.publish_shared,
+            (key,),
+            key="store",
+            priority=INTERACTIVE,
+            name=f"publish {key}",
+        )
+
+    async def publish_shared(self, key):
+        """
+        Send the current version of store `key` once to every client reading
+        it, then send each component reading it to the clients showing that
+        component, unless its html is the same as at its last render.
+        """
+        version, value = self.store.encoded(key)
+        if self._shared_published.get(key, 0) >= version:
+            # a later change of the key was published already
+            return
+        self._shared_published[key] = version
+        await self.sio_server.emit(
+            "meld-store",
+            {"key": key, "version": version, "value": value},
+            to=f"meld-store:{key}",
+            namespace=self.namespace,
+        )
+
+        for cid in self.store.subscribers(key):
+            component = self._components.get(cid)
+            if not isinstance(component, ComponentProxy):
+                continue
+            for name, shared_key in component._shared_names().items():
+                if shared_key == key:
+                    computed.invalidate(component.__wrapped__, name)
+            dom = component.render(client_digest=component.last_digest)
+            if dom is None:
+                continue
+            result = {
+                "id": str(component.cid),
+                "data": orjson.dumps(component._attributes()).decode("utf-8"),
+                "dom": dom,
+            }
+            await self.sio_server.emit(
+                "meld-response",
+                result,
+                to=f"meld-component:{cid}",
+                namespace=self.namespace,
+            )
+
+    async def _emit_to_others(self, sid, component, message, result):
+        """
+        Send the component answered to session `sid` to the other sessions.
+        The version and the digest of a response only hold for the client
+        which sent the message, so the others get the dom in any case.
+        """
+        others = {"id": result["id"], "data": result["data"]}
+        if message.get("renderDOM"):
+            others["dom"] = result.get("dom") or component.render()
+        await self.sio_server.emit(
+            "meld-response", others, skip_sid=sid, namespace=self.namespace
+        )
 
-        obj_id = id(obj)
-        self._components[cid] = self._components[obj_id] = component
+    async def _enter_room(self, sid, room):
+        entered = self.sio_server.enter_room(sid, room, namespace=self.namespace)
+        if inspect.isawaitable(entered):
+            # a coroutine in recent python-socketio versions
+            await entered
+
+    def _expire_sessions(self):
+        now = time.monotonic()
+        expired = [
+            token
+            for token, expires in self._sessions.items()
+            if expires is not None and expires <= now
+        ]
+        for token in expired:
+            del self._sessions[token]
 
     def _gen_sio_srv(self):
         """
         Called on object init. Creates SocketIO handler for the object
         """
-        self.sio_server = socketio.AsyncServer(
-            async_mode="aiohttp",
-            logger=self.logger,
-            # engineio_logger=True, ##TODO: INFO floods the log api
-            always_connect=True,
-        )
+        if self.server is not None:
+            self.sio_server = self.server.sio_server
+        else:
+            self.sio_server = socketio.AsyncServer(
+                async_mode="aiohttp",
+                logger=self.logger,
+                # engineio_logger=True, ##TODO: INFO floods the log api
+                always_connect=True,
+                transports=self.transports,
+                ping_interval=self.ping_interval,
+                ping_timeout=self.ping_timeout,
+            )
+
+        @self.on_event("connect")
+        async def connect(sid, environ, auth=None):
+            """
+            handle new SocketIO connections.
+            a known session token resumes the session, so the client keeps the
+            components it already initialized instead of sending meld-init again.
+            a token still connected, e.g. copied into a duplicated tab with its
+            sessionStorage, is not resumed: the connection gets a new token.
+            """
+            self._expire_sessions()
+            token = (auth or {}).get("token")
+            # only disconnected sessions have an expiry
+            resumed = self._sessions.get(token) is not None
+            if not resumed:
+                token = uuid4().hex
+            self._sessions[token] = None
+            self._session_tokens[sid] = token
+            if self.startup is not None:
+                if self.startup.mark("first client connected", once=True) is not None:
+                    self.logger.info("startup timeline: %s", self.startup.summary())
+            self.logger.debug("session %s connected, resumed: %s", token, resumed)
+            await self.sio_server.emit(
+                "meld-session",
+                {"token": token, "resumed": resumed},
+                to=sid,
+                namespace=self.namespace,
+            )
 
         @self.on_event("meld-message")
         async def meld_message(sid, message):
             """handle meld-message events on SocketIO channel"""
-            component = self.get_component(message["id"])
-            result = await process_message(component, message)
-            self.logger.debug("meld-message ready to send in session %s" % sid)
-            await self.sio_server.emit("meld-response", result)
+            if self._recorder is not None:
+                self._recorder.record("meld-message", sid, message)
+            message = await self.admission.admit(sid, "meld-message", message)
+            if message is None:
+                # shed, or coalesced into a waiting message
+                return
+            try:
+                component = self.get_component(message["id"])
+                result = await process_message(component, message, self.tasks, sid)
+                self.message_logger.debug(
+                    "meld-message ready to send in session %s", sid
+                )
+                await self.sio_server.emit(
+                    "meld-response", result, to=sid, namespace=self.namespace
+                )
+                if component is not None:
+                    await self._emit_to_others(sid, component, message, result)
+                    await self.emit_bulk(component, component._bulk_changed())
+                    if self._snapshots is not None:
+                        self._snapshots.save(component)
+            finally:
+                self.admission.release()
+
+        @self.on_event("disconnect")
+        async def disconnect(sid, *args):
+            """
+            cancel waiting events and background tasks of a closed session.
+            its token can resume it for `session_grace` seconds.
+            """
+            token = self._session_tokens.pop(sid, None)
+            if token is not None:
+                self._sessions[token] = time.monotonic() + self.session_grace
+            self.admission.forget(sid)
+            self.poller.forget(sid)
+            cancelled = self.tasks.cancel_session(sid)
+            if cancelled:
+                self.logger.debug("cancelled %s tasks of session %s", cancelled, sid)
 
         @self.on_event("meld-init")
         async def meld_init(sid, cid):
@@ -266,15 +816,190 @@ class MelTree(MelTreeHTTP):
             handle meld-init events on SocketIO channel.
             called once on object initialization on the GUI.
             """
-            self.logger.debug("meld-init event for component %s received" % cid)
+            self.message_logger.debug("meld-init event for component %s received", cid)
+            if self._recorder is not None:
+                self._recorder.record("meld-init", sid, cid)
+            if await self.admission.admit(sid, "meld-init", cid) is None:
+                return {}
+            try:
+                component = self.get_component(cid)
+                if component is None:
+                    return {}
+                return component._listeners()
+            finally:
+                self.admission.release()
+
+        @self.on_event("meld-bulk")
+        async def meld_bulk(sid, cid):
+            """
+            handle meld-bulk events on SocketIO channel.
+            sends every bulk attribute of the component to the requesting session.
+            """
             component = self.get_component(cid)
-            return component._listeners()
+            if component is not None:
+                await self.emit_bulk(component, to=sid)
+
+        @self.on_event("meld-visibility")
+        async def meld_visibility(sid, payload):
+            """
+            handle meld-visibility events on SocketIO channel.
+            the client reports if it is visible and which components it shows,
+            `@poll` methods only run for components of visible clients.
+            """
+            self.poller.set_session(sid, payload["components"], payload["visible"])
+
+        @self.on_event("meld-store")
+        async def meld_store(sid, subscription):
+            """
+            handle meld-store events on SocketIO channel.
+            the client sends the store keys its components read, with the
+            versions it has, and the ids of those components. it gets later
+            changes of the keys and re-renders of the components, and the
+            values newer than its versions in the answer.
+            """
+            entries = []
+            for key, version in subscription["keys"].items():
+                await self._enter_room(sid, f"meld-store:{key}")
+                current, value = self.store.encoded(key)
+                if current > (version or 0):
+                    entries.append({"key": key, "version": current, "value": value})
+            for cid in subscription.get("components", ()):
+                await self._enter_room(sid, f"meld-component:{cid}")
+            return entries
+
+        @self.on_event("meld-navigate")
+        async def meld_navigate(sid, path):
+            """
+            handle meld-navigate events on SocketIO channel.
+            renders the page at `path` for in-page navigation.
+            """
+            self.message_logger.debug("meld-navigate to %s in session %s", path, sid)
+            if await self.admission.admit(sid, "meld-navigate", path) is None:
+                return {"status": None}
+            try:
+                return await self.render_page(sid, path)
+            finally:
+                self.admission.release()
+
+    async def render_page(self, sid, path):
+        """
+        Render the page at `path` as an HTTP GET from the session `sid` would,
+        reusing the headers and cookies of the request that opened its socket.
+        The request goes through the middlewares of the app, so routes they
+        protect answer as they would over HTTP.
+
+        This relies on `Application._handle` of aiohttp 3.x, the dependency
+        range of the package: aiohttp has no public API to run a request
+        through routing and middlewares without a connection, and resolving
+        the route by hand needs the private match info of the request too.
+        Where `_handle` is missing the client does a full navigation.
+
+        Returns:
+            dict with the response `status` and its `html`, or with `redirect`
+            for redirects. Without `html` the client does a full navigation.
+        """
+        environ = self.sio_server.get_environ(sid, namespace=self.namespace)
+        origin = (environ or {}).get("aiohttp.request")
+        handle = getattr(origin, "app", None) and getattr(origin.app, "_handle", None)
+        if handle is None:
+            return {"status": None}
+
+        request = origin.clone(method="GET", rel_url=path)
+        try:
+            # resolves the route and applies the middlewares like a request
+            response = await handle(request)
+        except aiohttp.web.HTTPRedirection as e:
+            return {"status": e.status, "redirect": e.location}
+        except aiohttp.web.HTTPException as e:
+            return {"status": e.status}
+
+        if 300 <= response.status < 400 and "Location" in response.headers:
+            return {"status": response.status, "redirect": response.headers["Location"]}
+        if (
+            not isinstance(response, aiohttp.web.Response)
+            or response.content_type != "text/html"
+            or response.text is None
+        ):
+            return {"status": response.status}
+        return {"status": response.status, "html": response.text}
+
+    async def emit_bulk(self, component, names=None, to=None):
+        """
+        Send bulk attributes of `component` as chunked binary `meld-bulk` events.
+
+        Params:
+            component (ComponentProxy): registered component.
+            names (list[str]): bulk attributes to send. all of them if None.
+            to (str): session id to send to. broadcasts if None.
+        """
+        for packet in component._bulk_chunks(self.bulk_chunk_size, names):
+            await self.sio_server.emit(
+                "meld-bulk", packet, to=to, namespace=self.namespace
+            )
+
+    async def push_component(self, component):
+        """
+        Send the current data and html of `component` to its clients, e.g.
+        after a background task changed it.
+        """
+        result = {
+            "id": str(component.cid),
+            "data": orjson.dumps(component._attributes()).decode("utf-8"),
+            "dom": component.render(),
+        }
+        await self.sio_server.emit("meld-response", result, namespace=self.namespace)
+        await self.emit_bulk(component, component._bulk_changed())
+        if self._snapshots is not None:
+            self._snapshots.save(component)
+
+    async def _task_done(self, task):
+        if isinstance(task.context, ComponentProxy):
+            await self.push_component(task.context)
+
+    async def on_startup(self, app):
+        """
+        Binds the task scheduler to the loop the server runs on.
+        """
+        self.loop = asyncio.get_running_loop()
+        with self._emit_lock:
+            self.tasks.bind(self.loop)
+            early, self._early_emits = self._early_emits, []
+        for event_name, kwargs, future in early:
+            _forward(self._submit_emit(event_name, kwargs), future)
+
+    async def prewarm(self):
+        """
+        Compile templates in a worker thread while the dispatch tables of
+        registered component classes are built on the loop. lazy components
+        are not constructed.
+        """
+
+        async def build_tables():
+            for component in list(self._components.values()):
+                if isinstance(component, ComponentProxy):
+                    component = type(component.__wrapped__)
+                if isinstance(component, type):
+                    get_dispatch_table(component)
+                # let the server answer requests in between
+                await asyncio.sleep(0)
+            self.startup.mark("component dispatch tables built")
+
+        await asyncio.gather(super().prewarm(), build_tables())
 
     async def on_shutdown(self, app):
         """
         Handles on shutdown cleanups.
         """
-        if not self.sio_server:
+        await self.poller.close()
+        await self.tasks.shutdown()
+        if self._recorder is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._recorder.close)
+        if self._snapshots is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._snapshots.close
+            )
+        if not self.sio_server or self.server is not None:
+            # shared servers close their sockets themselves
             return
         for ws in self.sio_server.eio.sockets.values():
             await ws.close(abort=True)
@@ -299,6 +1024,223 @@ def listen(*event_names: str, app_name: str = None):
     return dec
 
 
+class computed(object):
+    """
+    Decorator for component properties whose value is derived from other
+    attributes. The value is cached per instance together with the attributes
+    read while computing it, and recomputed only after one of those attributes
+    is assigned (by `syncInput`, a component method or any other code).
+    In-place mutations, e.g. `self.items.append(...)`, are not detected.
+
+    Computed properties are serialized by `_attributes()` like plain attributes.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        if not getattr(owner.__setattr__, "_meld_computed", False):
+            owner.__setattr__ = _invalidating_setattr(owner.__setattr__)
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+
+        cache = obj.__dict__.setdefault("_meld_computed", {})
+        try:
+            return cache[self.name][0]
+        except KeyError:
+            pass
+
+        tracker = _ReadTracker(obj)
+        value = self.func(tracker)
+        cache[self.name] = (value, frozenset(tracker._reads))
+        return value
+
+    def __set__(self, obj, value):
+        raise AttributeError(f"can't set computed attribute '{self.name}'")
+
+    @staticmethod
+    def invalidate(obj, name):
+        """
+        Drop the computed values of `obj` depending on attribute `name`, for
+        changes made without assigning the attribute, e.g. of `shared` keys.
+        """
+        _invalidate_computed(obj, name)
+
+
+class _ReadTracker(object):
+    """
+    Stand-in for `self` while a computed property runs, recording attribute reads.
+    """
+
+    __slots__ = ("_obj", "_reads")
+
+    def __init__(self, obj):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_reads", set())
+
+    def __getattr__(self, name):
+        self._reads.add(name)
+        prop = inspect.getattr_static(type(self._obj), name, None)
+        if isinstance(prop, property) and prop.fget is not None:
+            # track the attributes read by plain properties too
+            return prop.fget(self)
+        value = getattr(self._obj, name)
+        if isinstance(value, MethodType) and value.__self__ is self._obj:
+            # track reads made by helper methods too
+            return MethodType(value.__func__, self)
+        return value
+
+    def __setattr__(self, name, value):
+        setattr(self._obj, name, value)
+
+
+def _invalidating_setattr(setattr_func):
+    def __setattr__(obj, name, value):
+        setattr_func(obj, name, value)
+        _invalidate_computed(obj, name)
+
+    __setattr__._meld_computed = True
+    return __setattr__
+
+
+def _invalidate_computed(obj, name):
+    """
+    Drop cached computed values depending on `name`, and on those values in turn.
+    """
+    cache = obj.__dict__.get("_meld_computed")
+    if not cache:
+        return
+
+    stale = [key for key, (_, reads) in cache.items() if name in reads]
+    for key in stale:
+        if cache.pop(key, None) is not None:
+            _invalidate_computed(obj, key)
+
+
+def inline(func):
+    """
+    Decorator to run a sync component method directly on the event loop instead
+    of the thread pool. Only use it for short methods that never block, e.g.
+    methods updating a few attributes.
+    """
+    func._meld_inline = True
+    return func
+
+
+def poll(interval: float):
+    """
+    Decorator to call the decorated method every `interval` seconds while a
+    visible client shows the component. Methods with the same interval are
+    called on the same tick of the app's poller, and their components are sent
+    to each client in a single `meld-frame`.
+
+    Params:
+        interval (float): seconds between calls.
+    """
+
+    def dec(func):
+        func._meld_poll = interval
+        return func
+
+    return dec
+
+
+def background(func=None, *, priority="batch"):
+    """
+    Decorator to run a component method as a task of the app's scheduler. The
+    message calling it is answered right away and the component is sent to
+    its clients again when the method returns. The task is cancelled when the
+    calling session disconnects.
+
+    Params:
+        priority (str): `"batch"` (default) or `"interactive"`, the order in
+            which queued methods of a component class start.
+    """
+
+    def dec(func):
+        func._meld_background = PRIORITIES[priority]
+        return func
+
+    return dec if func is None else dec(func)
+
+
+class shared(object):
+    """
+    Component attribute reading key `key` of the store of the app the component
+    is registered on, `default` while the key is unset. Assigning the attribute
+    sets the key, so every component reading it shares one copy of the value.
+
+    When the key changes, only the components reading it are re-rendered, and
+    each client receives the new value once, not once per component. In the
+    browser the components reading a key hold the same object. Re-assign the
+    attribute to publish a new value; in-place mutations are not detected.
+
+    Shared attributes are left out of the data payload of `_attributes()`.
+    Before the component is registered they read `default` and can't be set.
+
+    Params:
+        key (str): store key. defaults to the attribute name.
+        default: value while the key is unset.
+    """
+
+    def __init__(self, key=None, default=None):
+        self.key = key
+        self.default = default
+
+    def __set_name__(self, owner, name):
+        if self.key is None:
+            self.key = name
+        owner._meld_shared_attributes = {
+            **getattr(owner, "_meld_shared_attributes", {}),
+            name: self.key,
+        }
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        store = obj.__dict__.get("_meld_store")
+        if store is None:
+            return self.default
+        return store.get(self.key, self.default)
+
+    def __set__(self, obj, value):
+        store = obj.__dict__.get("_meld_store")
+        if store is None:
+            raise AttributeError(
+                f"can't set shared attribute '{self.key}' of a component "
+                "which is not registered"
+            )
+        store.set(self.key, value)
+
+
+def bulk(*attribute_names: str):
+    """
+    Class decorator to declare component attributes holding large numeric data
+    (lists of floats, `array.array`, NumPy arrays, bytes).
+
+    Bulk attributes are left out of the JSON data payload and transferred to the
+    client as chunked binary buffers, readable there as typed arrays with
+    `Meld.getBulk(componentId, name)`. Re-assign the attribute to publish a new
+    value; in-place mutations are not detected.
+
+    Params:
+        *attribute_names (str): One or more attribute names.
+    """
+
+    def dec(cls):
+        cls._meld_bulk_attributes = (
+            tuple(getattr(cls, "_meld_bulk_attributes", ())) + attribute_names
+        )
+        return cls
+
+    return dec
+
+
 def emit(event_name: str, app_name="MelTree", **kwargs):
     """
     Emit a custom event which will call any Component methods with the `@listen`
@@ -314,12 +1256,109 @@ def emit(event_name: str, app_name="MelTree", **kwargs):
         app = MelTree(app_name=app_name)
     else:
         app = MelTree()
-    sio_server = app.sio_server
+    return app.emit(event_name, **kwargs)
+
+
+class MelTreeServer(object):
+    """
+    One aiohttp server, event loop and SocketIO server hosting several MelTree
+    apps. Each app is mounted under `/<app_name>/` with its own SocketIO
+    namespace and component table.
+
+    Parameters
+    ----------
+    transports, ping_interval, ping_timeout :
+        SocketIO options shared by all apps, see `MelTree`.
+    """
+
+    def __init__(self, transports=None, ping_interval=25, ping_timeout=20):
+        self.transports = list(transports) if transports else None
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.apps = {}
+        self.logger = setup_logger("MelTreeServer")
+        self.http_server = aiohttp.web.Application()
+        self.http_server.router.add_static(
+            "/meltree_static", Path(__file__).parent / "static/meltree_static"
+        )
+        self.sio_server = socketio.AsyncServer(
+            async_mode="aiohttp",
+            logger=self.logger,
+            always_connect=True,
+            transports=self.transports,
+            ping_interval=ping_interval,
+            ping_timeout=ping_timeout,
+        )
+        self.sio_server.attach(self.http_server)
+        self.http_server.on_shutdown.append(self.on_shutdown)
+
+    def app(self, app_name, **kwargs):
+        """
+        Get the app registered as `app_name`, creating it on this server.
+        """
+        if app_name in MelTree.cache and not kwargs:
+            app = MelTree(app_name)
+        else:
+            app = MelTree(app_name, server=self, **kwargs)
+        if app.server is not self:
+            raise ValueError(f"app {app_name!r} is hosted on another server")
+        return app
+
+    def mount(self, app):
+        """
+        Host `app`. its routes are added to the server when it runs.
+        """
+        if app._name in self.apps:
+            raise ValueError(f"app {app._name!r} is already mounted")
+        self.apps[app._name] = app
+
+    def setup(self):
+        """
+        Add the routes of every mounted app to the server.
+        """
+        for name, app in self.apps.items():
+            app.http_server.add_routes(app.http_routes)
+            self.http_server.add_subapp(f"/{name}/", app.http_server)
+        return self.http_server
+
+    def run(self, **kwargs):
+        """
+        Run all mounted apps. keyword arguments are passed to
+        `aiohttp.web.run_app`.
+        """
+        aiohttp.web.run_app(self.setup(), **kwargs)
+
+    async def on_shutdown(self, app):
+        for ws in list(self.sio_server.eio.sockets.values()):
+            await ws.close(abort=True)
+
+
+def _split_query(value):
+    return [item for item in value.split(",") if item] if value else None
+
+
+def _loop_running():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _forward(source, target):
+    """
+    Settle `concurrent.futures.Future` `target` like asyncio future `source`.
+    """
 
-    async def _emit():
-        await sio_server.emit("meld-event", {"event": event_name, "message": kwargs})
+    def callback(source):
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
 
-    sio_server.start_background_task(_emit)
+    source.add_done_callback(callback)
 
 
 class BaseComponents:
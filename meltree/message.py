@@ -1,12 +1,22 @@
 import ast
+import copy
 import orjson
 import asyncio
+import inspect
 import functools
+from typing import NamedTuple
 from aiohttp import web
 from concurrent.futures import ThreadPoolExecutor
+from meltree.profiler import profiler
 
 thread_pool = ThreadPoolExecutor(max_workers=5)
 
+# component class -> {method name: Invoker}
+_dispatch_tables = {}
+
+# parsed call arguments of these types are safe to share from the parse cache
+_IMMUTABLE_PARAMS = (str, int, float, complex, bool, bytes, type(None))
+
 
 def make_async(func):
     @functools.wraps(func)
@@ -16,14 +26,160 @@ def make_async(func):
     return wrapper
 
 
-async def process_message(component, message):
+class Invoker(NamedTuple):
+    """
+    Prebuilt caller of a component method.
+
+    Attributes
+    ----------
+    func :
+        plain function defined on the component class.
+    is_async :
+        True for coroutine functions, awaited on the event loop.
+    inline :
+        True for sync methods decorated with `@inline`, called on the event loop.
+        other sync methods run in `thread_pool`.
+    arity :
+        number of positional parameters besides `self`, None if variadic.
+    background :
+        task priority of methods decorated with `@background`, None otherwise.
+        they are submitted to the app's task scheduler instead of awaited.
+    """
+
+    func: callable
+    is_async: bool
+    inline: bool
+    arity: int
+    background: int = None
+
+    async def __call__(self, obj, params=None, message=None):
+        func = self.func
+        if params and self.arity is not None and len(params) > self.arity:
+            raise TypeError(
+                f"{func.__qualname__}() takes {self.arity} arguments "
+                f"but {len(params)} were given"
+            )
+
+        if self.is_async:
+            if params:
+                return await func(obj, *params)
+            elif message:
+                return await func(obj, **message)
+            return await func(obj)
+
+        if self.inline:
+            if params:
+                return func(obj, *params)
+            elif message:
+                return func(obj, **message)
+            return func(obj)
+
+        if params:
+            future = thread_pool.submit(func, obj, *params)
+        elif message:
+            future = thread_pool.submit(functools.partial(func, obj, **message))
+        else:
+            future = thread_pool.submit(func, obj)
+        return await asyncio.wrap_future(future)
+
+
+def _make_invoker(func):
+    arity = 0
+    for param in list(inspect.signature(func).parameters.values())[1:]:
+        if param.kind is param.VAR_POSITIONAL:
+            arity = None
+            break
+        if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+            arity += 1
+
+    return Invoker(
+        func=func,
+        is_async=asyncio.iscoroutinefunction(func),
+        inline=getattr(func, "_meld_inline", False),
+        arity=arity,
+        background=getattr(func, "_meld_background", None),
+    )
+
+
+def get_dispatch_table(cls):
+    """
+    Get the method name to `Invoker` mapping of a component class.
+    Built once per class and only covers public plain functions.
+    """
+    try:
+        return _dispatch_tables[cls]
+    except KeyError:
+        pass
+
+    table = {}
+    for name in dir(cls):
+        if name.startswith("_"):
+            continue
+        func = inspect.getattr_static(cls, name)
+        if inspect.isfunction(func):
+            table[name] = _make_invoker(func)
+
+    _dispatch_tables[cls] = table
+    return table
+
+
+async def call_method(
+    component, method_name, params=None, message=None, tasks=None, sid=None
+):
+    """
+    Call `method_name` on the component through the class dispatch table.
+    Falls back to attribute lookup for callables set on the instance.
+
+    `@background` methods are submitted to the `tasks` scheduler on behalf of
+    session `sid` and their future is returned without waiting for it.
+    """
+    obj = component.__wrapped__
+    invoker = get_dispatch_table(type(obj)).get(method_name)
+    if invoker is not None and invoker.background is not None and tasks is not None:
+        return tasks.submit(
+            invoker,
+            (obj, params, message),
+            key=type(obj).__name__,
+            priority=invoker.background,
+            sid=sid,
+            name=f"{type(obj).__name__}.{method_name}",
+            context=component,
+        )
+    if invoker is not None:
+        if invoker.is_async:
+            with profiler.section(obj, method_name):
+                return await invoker(obj, params, message)
+        if profiler.active:
+            # open the section in the thread running the method
+            func = profiler.wrap(obj, method_name, invoker.func)
+            invoker = invoker._replace(func=func)
+        return await invoker(obj, params, message)
+
+    if not hasattr(component, method_name):
+        return None
+    func = getattr(component, method_name)
+    if not asyncio.iscoroutinefunction(func):
+        # make it awaitable function
+        func = make_async(func)
+
+    if params:
+        return await func(*params)
+    elif message:
+        return await func(**message)
+    return await func()
+
+
+async def process_message(component, message, tasks=None, sid=None):
     cid = message["id"]
     component_name = message["componentName"]
     action_queue = message["actionQueue"]
     render_dom = message.get("renderDOM", False)
     data = message["data"]
+    # clients sending a version apply model changes optimistically
+    version = message.get("version")
 
     return_data = None
+    called = False
     for action in action_queue:
         payload = action.get("payload", None)
         if "syncInput" in action["type"]:
@@ -44,36 +200,73 @@ async def process_message(component, message):
             method_name, params = parse_call_method_name(call_method_name)
             message = payload.get("message")
 
-            if method_name is not None and hasattr(component, method_name):
-                func = getattr(component, method_name)
-                if not asyncio.iscoroutinefunction(func):
-                    # make it awaitable function
-                    func = make_async(func)
+            if method_name is not None:
+                return_data = await call_method(
+                    component, method_name, params, message, tasks, sid
+                )
+                called = True
 
-                if params:
-                    return_data = await func(*params)
-                elif message:
-                    return_data = await func(**message)
-                else:
-                    return_data = await func()
-                if component._form:
-                    component._bind_form(component._attributes())
-    res = {
-        "id": cid,
-        "data": orjson.dumps(component._attributes()).decode("utf-8")
-        if component
-        else {},
-    }
+    if called and component._form:
+        component._bind_form(component._attributes())
+
+    with profiler.section(component and component.__wrapped__, "serialize"):
+        res = {
+            "id": cid,
+            "data": orjson.dumps(component._attributes()).decode("utf-8")
+            if component
+            else {},
+        }
+
+    if version is not None:
+        res["version"] = version
 
     if render_dom:
-        res["dom"] = component.render()
+        # without method calls only model fields changed, which optimistic
+        # clients already show; skip the dom unless the template output differs
+        # from the one the client shows
+        digest = message.get("digest") if version is not None and not called else None
+        dom = component.render(client_digest=digest)
+        if dom is not None:
+            res["dom"] = dom
 
     if type(return_data) is web.Response and return_data.status_code == 302:
         res["redirect"] = {"url": return_data.location}
     return res
 
 
+def _parse_simple_literal(param_str):
+    """
+    Parse a single quoted string or integer argument without `ast`.
+    Raises ValueError for anything else.
+    """
+    quote = param_str[:1]
+    if (
+        quote in ("'", '"')
+        and len(param_str) > 1
+        and param_str[-1] == quote
+        and quote not in param_str[1:-1]
+        and "\\" not in param_str
+    ):
+        return param_str[1:-1]
+    if not param_str.isascii():
+        raise ValueError(param_str)
+    return int(param_str)
+
+
 def parse_call_method_name(call_method_name: str):
+    """
+    Split a `name(args)` call string into the method name and a tuple of
+    arguments. Results are cached since templates emit a small, fixed set of
+    call strings; mutable arguments are copied so methods can't alter the cache.
+    """
+    method_name, params = _parse_call_method_name(call_method_name)
+    if params and not all(isinstance(p, _IMMUTABLE_PARAMS) for p in params):
+        params = copy.deepcopy(params)
+    return method_name, params
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_call_method_name(call_method_name: str):
     params = None
     method_name = call_method_name
 
@@ -82,14 +275,20 @@ def parse_call_method_name(call_method_name: str):
         params_str = call_method_name[param_idx:]
 
         # Remove the arguments from the method name
-        method_name = call_method_name.replace(params_str, "")
+        method_name = call_method_name[:param_idx]
 
         # Remove parenthesis
-        params_str = params_str[1:-1]
-        if params_str != "":
+        params_str = params_str[1:-1].strip()
+        if params_str != "" and "," not in params_str:
+            # fast path for the common single literal argument
+            try:
+                params = (_parse_simple_literal(params_str),)
+            except ValueError:
+                pass
+        if params_str != "" and params is None:
             try:
-                params = ast.literal_eval("[" + params_str + "]")
+                params = tuple(ast.literal_eval("[" + params_str + "]"))
             except (ValueError, SyntaxError):
-                params = list(map(str.strip, params_str.split(",")))
+                params = tuple(map(str.strip, params_str.split(",")))
 
     return method_name, params
@@ -0,0 +1,257 @@
+import math
+import time
+import asyncio
+import logging
+
+import orjson
+
+from meltree.message import call_method, get_dispatch_table
+
+
+class _PollEntry(object):
+    __slots__ = ("cid", "method", "ticks", "due", "paused")
+
+    def __init__(self, cid, method, ticks):
+        self.cid = cid
+        self.method = method
+        self.ticks = ticks
+        self.due = None
+        self.paused = True
+
+
+class Poller(object):
+    """
+    Single timer wheel calling the `@poll` methods of every mounted component.
+
+    The wheel turns every `resolution` seconds. A method polled every
+    `interval` seconds is due on the ticks which are multiples of its
+    interval, so components polled at the same rate are called together.
+    Components are only polled while at least one visible client shows them;
+    clients report what they show with `meld-visibility` events.
+
+    The due methods of a tick run concurrently, then each client gets a single
+    `meld-frame` event with the data and html of its updated components.
+    The wheel stops while nothing is polled. After the loop was busy for
+    several ticks, each overdue method runs once and is rescheduled from the
+    current tick.
+
+    Attributes
+    ----------
+    resolution :
+        seconds between ticks. poll intervals are rounded to it.
+    size :
+        number of wheel slots.
+    last_tick :
+        work done by the last tick with due methods, see `stats`.
+    """
+
+    def __init__(self, app, resolution=0.1, size=512, logger=None):
+        self.app = app
+        self.resolution = resolution
+        self.size = size
+        self.logger = logger or logging.getLogger(__name__)
+        self.tick = 0
+        self.last_tick = None
+        self.totals = {"ticks": 0, "calls": 0, "frames": 0, "overruns": 0}
+        self._wheel = [[] for _ in range(size)]
+        self._entries = {}  # cid -> list of _PollEntry
+        self._sessions = {}  # sid -> (visible, set of cids)
+        self._methods = {}  # component class -> [(method name, ticks)]
+        self._scheduled = 0  # entries on the wheel
+        self._task = None
+
+    def _poll_methods(self, cls):
+        try:
+            return self._methods[cls]
+        except KeyError:
+            pass
+        methods = [
+            (name, max(1, round(invoker.func._meld_poll / self.resolution)))
+            for name, invoker in get_dispatch_table(cls).items()
+            if getattr(invoker.func, "_meld_poll", None) is not None
+        ]
+        self._methods[cls] = methods
+        return methods
+
+    def set_session(self, sid, cids, visible):
+        """
+        Record which components session `sid` shows and if it is visible.
+        """
+        self._sessions[sid] = (visible, set(cids))
+        for cid in cids:
+            if cid not in self._entries:
+                component = self.app.get_component(cid)
+                if component is None:
+                    continue
+                self._entries[cid] = [
+                    _PollEntry(cid, name, ticks)
+                    for name, ticks in self._poll_methods(type(component.__wrapped__))
+                ]
+        self._drop_unshown()
+        self._update()
+
+    def forget(self, sid):
+        self._sessions.pop(sid, None)
+        self._drop_unshown()
+        self._update()
+
+    def _drop_unshown(self):
+        """
+        Drop the entries of components no session shows. the ones on the wheel
+        are discarded when they are due.
+        """
+        shown = set()
+        for _, session_cids in self._sessions.values():
+            shown |= session_cids
+        for cid in [cid for cid in self._entries if cid not in shown]:
+            del self._entries[cid]
+
+    def _visible_cids(self):
+        cids = set()
+        for visible, session_cids in self._sessions.values():
+            if visible:
+                cids |= session_cids
+        return cids
+
+    def _update(self):
+        """
+        Resume entries of components shown by a visible client, and start the
+        wheel if anything has to be polled.
+        """
+        visible = self._visible_cids()
+        if self._task is None:
+            self.tick = self._current_tick()
+        resumed = False
+        for cid in visible:
+            for entry in self._entries.get(cid, ()):
+                if entry.paused:
+                    entry.paused = False
+                    self._schedule(entry)
+                    resumed = True
+        if resumed and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _current_tick(self):
+        return math.floor(asyncio.get_running_loop().time() / self.resolution + 0.5)
+
+    def _schedule(self, entry):
+        # align to the interval so entries with the same one are due together
+        entry.due = (self.tick // entry.ticks + 1) * entry.ticks
+        self._wheel[entry.due % self.size].append(entry)
+        self._scheduled += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._scheduled:
+            delay = self.resolution - loop.time() % self.resolution
+            await asyncio.sleep(delay)
+            current = self._current_tick()
+            if current <= self.tick:
+                continue
+            previous, self.tick = self.tick, current
+            try:
+                await self.turn(since=previous)
+            except Exception:
+                self.logger.exception("poll tick %s failed", current)
+        self._task = None
+
+    async def turn(self, since=None):
+        """
+        Run the methods due since tick `since` (the previous tick by default)
+        and send their frames. Methods run once however many of their ticks
+        were skipped.
+        """
+        if since is None:
+            since = self.tick - 1
+        due = []
+        for tick in range(max(since + 1, self.tick - self.size + 1), self.tick + 1):
+            slot = self._wheel[tick % self.size]
+            if slot:
+                due.extend(entry for entry in slot if entry.due <= self.tick)
+                slot[:] = [entry for entry in slot if entry.due > self.tick]
+        if not due:
+            return
+        self._scheduled -= len(due)
+
+        started = time.perf_counter()
+        visible = self._visible_cids()
+        calls = []
+        paused = 0
+        for entry in due:
+            if entry not in self._entries.get(entry.cid, ()):
+                # dropped while on the wheel
+                continue
+            component = self.app.get_component(entry.cid)
+            if entry.cid not in visible or component is None:
+                entry.paused = True
+                paused += 1
+                continue
+            calls.append((entry, component))
+            self._schedule(entry)
+
+        results = await asyncio.gather(
+            *(
+                call_method(component, entry.method, tasks=self.app.tasks)
+                for entry, component in calls
+            ),
+            return_exceptions=True,
+        )
+        updates = {}
+        for (entry, component), result in zip(calls, results):
+            if isinstance(result, Exception):
+                self.logger.error(
+                    "poll of %s.%s failed", entry.cid, entry.method, exc_info=result
+                )
+            elif entry.cid not in updates:
+                updates[entry.cid] = {
+                    "id": str(component.cid),
+                    "data": orjson.dumps(component._attributes()).decode("utf-8"),
+                    "dom": component.render(),
+                }
+
+        frames = 0
+        for sid, (session_visible, cids) in list(self._sessions.items()):
+            frame = [updates[cid] for cid in cids if cid in updates]
+            if frame and session_visible:
+                await self.app.sio_server.emit(
+                    "meld-frame", frame, to=sid, namespace=self.app.namespace
+                )
+                frames += 1
+
+        duration = time.perf_counter() - started
+        self.last_tick = {
+            "tick": self.tick,
+            "due": len(due),
+            "calls": len(calls),
+            "paused": paused,
+            "components": len(updates),
+            "frames": frames,
+            "duration_ms": duration * 1e3,
+        }
+        self.totals["ticks"] += 1
+        self.totals["calls"] += len(calls)
+        self.totals["frames"] += frames
+        if duration > self.resolution:
+            self.totals["overruns"] += 1
+            self.logger.warning("poll tick took %.1f ms", duration * 1e3)
+        self.logger.debug("poll tick %s", self.last_tick)
+
+    def stats(self):
+        """
+        Work of the last tick and totals since start.
+        """
+        return {
+            "last_tick": self.last_tick,
+            "polled": sum(
+                not entry.paused
+                for entries in self._entries.values()
+                for entry in entries
+            ),
+            **self.totals,
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,265 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import nullcontext
+from collections import Counter
+
+_NOOP = nullcontext()
+
+MODES = ("cprofile", "sampling")
+
+
+class ComponentProfiler(object):
+    """
+    Runtime-toggleable profiler scoped to component methods and render stages.
+
+    Instrumented code calls `section(obj, name)` around each stage; while the
+    profiler is stopped this returns a shared no-op context manager, so the
+    cost is one attribute check. Section names are component method names or
+    one of the render stages: `render_template`, `soup` and `serialize`.
+    Sections around async methods also cover whatever else runs on the event
+    loop while they await.
+
+    In `cprofile` mode sections run under a per-thread `cProfile.Profile` and
+    are dumped as a pstats file. Since Python 3.12 only one profiler can be
+    active at a time, so a single profile is enabled while any thread is in a
+    section; it also records what other threads run meanwhile. In `sampling`
+    mode a background thread samples the stacks of threads inside a section
+    and they are dumped as collapsed stacks, the input format of flamegraph
+    tools.
+
+    Attributes
+    ----------
+    active :
+        True while a profiling window is open.
+    output_dir :
+        directory dumps are written to.
+    """
+
+    active = False
+    _window = 0
+    # cProfile is built on sys.monitoring since 3.12, which allows one tool
+    shared_profile = sys.version_info >= (3, 12)
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._timer = None
+        self._expired_dump = None  # dump of a window closed by its duration
+        self._reset()
+
+    def _reset(self):
+        self.mode = None
+        self.classes = None
+        self.sections = None
+        self.deadline = None
+        self.interval = None
+        self._profiles = []
+        self._samples = Counter()
+        self._running = {}  # thread id -> stack of open section labels
+        self._shared = None  # profile enabled while any thread is in a section
+        self._open = 0  # threads in a section, with the shared profile
+        self._sampler = None
+
+    def start(self, classes=None, sections=None, duration=None, mode="cprofile"):
+        """
+        Open a profiling window.
+
+        Params:
+            classes (list[str]): component class names to profile. all if None.
+            sections (list[str]): method or render stage names. all if None.
+            duration (float): seconds until the window closes by itself.
+            mode (str): `cprofile` or `sampling`.
+        """
+        if mode not in MODES:
+            raise ValueError(f"unknown profiler mode {mode!r}")
+        with self._lock:
+            if self.active:
+                raise RuntimeError("profiler is already running")
+            self._reset()
+            self._window += 1
+            self.mode = mode
+            self.classes = set(classes) if classes else None
+            self.sections = set(sections) if sections else None
+            self.deadline = time.monotonic() + duration if duration else None
+            self.interval = 0.005
+            self.active = True
+            self._expired_dump = None
+            if duration:
+                self._timer = threading.Timer(
+                    duration, self._expire, args=(self._window,)
+                )
+                self._timer.daemon = True
+                self._timer.start()
+
+        if mode == "sampling":
+            self._sampler = threading.Thread(
+                target=self._sample, name="meltree-profiler", daemon=True
+            )
+            self._sampler.start()
+
+    def stop(self):
+        """
+        Close the profiling window and dump what was collected.
+        Returns the dump path. When the window was closed by its duration, the
+        dump written then is returned once. Otherwise None if the profiler
+        wasn't running.
+        """
+        path = self._close()
+        if path is None:
+            with self._lock:
+                path, self._expired_dump = self._expired_dump, None
+        return path
+
+    def _expire(self, window):
+        # runs in the timer thread, so requests don't write the dump
+        path = self._close(window)
+        if path is not None:
+            self._expired_dump = path
+
+    def _close(self, window=None):
+        with self._lock:
+            if not self.active or window not in (None, self._window):
+                return None
+            self.active = False
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        if self._sampler is not None:
+            self._sampler.join()
+
+        output_dir = self.output_dir or os.getcwd()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self.mode == "cprofile":
+            path = os.path.join(output_dir, f"meltree-{stamp}.pstats")
+            with self._lock:
+                profiles = list(self._profiles)
+            if profiles:
+                pstats.Stats(*profiles).dump_stats(path)
+            else:
+                cProfile.Profile().dump_stats(path)
+        else:
+            path = os.path.join(output_dir, f"meltree-{stamp}.collapsed")
+            with open(path, "w") as f:
+                for stack, count in sorted(self._samples.items()):
+                    f.write(f"{stack} {count}\n")
+        return path
+
+    def status(self):
+        return {
+            "active": self.active,
+            "mode": self.mode,
+            "classes": sorted(self.classes) if self.classes else None,
+            "sections": sorted(self.sections) if self.sections else None,
+            "remaining": (
+                max(0.0, self.deadline - time.monotonic())
+                if self.active and self.deadline
+                else None
+            ),
+        }
+
+    def section(self, obj, name):
+        """
+        Context manager profiling `name` of component `obj` if it is in scope.
+        """
+        if not self.active:
+            return _NOOP
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            # the timer is closing the window
+            return _NOOP
+        if self.classes is not None and type(obj).__name__ not in self.classes:
+            return _NOOP
+        if self.sections is not None and name not in self.sections:
+            return _NOOP
+        return _Section(self, f"{type(obj).__name__}.{name}")
+
+    def wrap(self, obj, name, func):
+        """
+        Wrap sync `func` so the section is opened in the thread running it.
+        """
+
+        def wrapper(*args, **kwargs):
+            with self.section(obj, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def _enter(self, label):
+        tid = threading.get_ident()
+        labels = self._running.setdefault(tid, [])
+        labels.append(label)
+        if self.mode == "cprofile" and len(labels) == 1 and self.shared_profile:
+            with self._lock:
+                self._open += 1
+                if self._open == 1:
+                    if self._shared is None:
+                        self._shared = cProfile.Profile()
+                        self._profiles.append(self._shared)
+                    self._shared.enable()
+        elif self.mode == "cprofile" and len(labels) == 1:
+            # one profile per thread and profiling window
+            window, profile = getattr(self._local, "profile", (None, None))
+            if window != self._window:
+                profile = cProfile.Profile()
+                self._local.profile = (self._window, profile)
+                with self._lock:
+                    self._profiles.append(profile)
+            profile.enable()
+
+    def _exit(self):
+        tid = threading.get_ident()
+        labels = self._running.get(tid)
+        if labels:
+            labels.pop()
+        if not labels:
+            self._running.pop(tid, None)
+            if self.mode == "cprofile" and self.shared_profile:
+                with self._lock:
+                    # sections opened before the window was restarted
+                    self._open = max(0, self._open - 1)
+                    if self._open == 0 and self._shared is not None:
+                        self._shared.disable()
+                return
+            window, profile = getattr(self._local, "profile", (None, None))
+            if profile is not None:
+                profile.disable()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while self.active:
+            frames = sys._current_frames()
+            for tid, labels in list(self._running.items()):
+                frame = frames.get(tid)
+                if tid == own or frame is None or not labels:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(labels[0])
+                self._samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+
+class _Section(object):
+    __slots__ = ("profiler", "label")
+
+    def __init__(self, profiler, label):
+        self.profiler = profiler
+        self.label = label
+
+    def __enter__(self):
+        self.profiler._enter(self.label)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._exit()
+
+
+# process wide profiler used by the instrumented stages
+profiler = ComponentProfiler()
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+
+class TrafficRecorder(object):
+    """
+    Writes inbound socket events to a log file, one orjson encoded
+    `[timestamp, event, sid, data]` line per event.
+
+    Events are encoded when recorded and written and flushed one by one by a
+    background thread, so a trace survives the process being killed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "ab")
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def record(self, event, sid, data):
+        """
+        Queue the event for writing. Returns the future of the write.
+        """
+        line = orjson.dumps([time.time(), event, sid, data]) + b"\n"
+        return self._executor.submit(self._write, line)
+
+    def _write(self, line):
+        self._file.write(line)
+        self._file.flush()
+
+    def flush(self):
+        """
+        Wait until the queued events are written.
+        """
+        self._executor.submit(self._file.flush).result()
+
+    def close(self):
+        """
+        Wait for the queued writes and close the file.
+        """
+        self._executor.shutdown(wait=True)
+        self._file.close()
+
+
+def read_trace(path):
+    with open(path, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
@@ -0,0 +1,189 @@
+"""
+Record inbound socket traffic of a MelTree app and replay it for performance
+regression testing.
+
+Record by passing `record_path` to `MelTree`, then replay the trace against a
+fresh instance of the app:
+
+    python -m meltree.replay myapp:mt trace.log --speed max --output run.json
+    python -m meltree.replay myapp:mt trace.log --baseline run.json
+
+Replayed messages are matched to components by cid, so components have to be
+registered with an explicit `cid` to be found again in a fresh app. They go
+through the SocketIO handlers of the app like live traffic, admission included:
+replayed at `max` speed, a session is held to the rate of `app.admission`.
+"""
+
+import sys
+import math
+import time
+import asyncio
+import argparse
+import importlib
+import statistics
+from contextlib import contextmanager
+
+import orjson
+
+from meltree.component import ComponentProxy
+from meltree.recorder import read_trace
+
+
+@contextmanager
+def _measured(app, meter):
+    """
+    Count the bytes of the events `app` emits and the time spent rendering
+    components into `meter` while replaying.
+    """
+    emit = app.sio_server.emit
+    render = ComponentProxy.render
+
+    async def measured_emit(event, data=None, *args, **kwargs):
+        if event != "meld-bulk":
+            meter["size"] += len(orjson.dumps(data))
+        return await emit(event, data, *args, **kwargs)
+
+    def measured_render(component, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return render(component, *args, **kwargs)
+        finally:
+            meter["render_ms"] += (time.perf_counter() - start) * 1e3
+
+    app.sio_server.emit = measured_emit
+    ComponentProxy.render = measured_render
+    try:
+        yield
+    finally:
+        app.sio_server.emit = emit
+        ComponentProxy.render = render
+
+
+async def replay(app, trace, speed=None):
+    """
+    Feed recorded events to the SocketIO handlers of `app` and measure each
+    of them.
+
+    Params:
+        app (MelTree): fresh app with the recorded components registered.
+        trace (list): records returned by `read_trace`.
+        speed (float): 1.0 replays at the original pace, 2.0 twice as fast.
+            None replays as fast as possible.
+
+    Returns:
+        list of dicts with `event`, `cid`, `latency_ms`, `render_ms` and `size`
+        (bytes answered and emitted), or `missing` for components not
+        registered in `app`.
+    """
+    results = []
+    handlers = app.sio_server.handlers[app.namespace]
+    started = time.perf_counter()
+    first_timestamp = trace[0][0] if trace else 0
+
+    for timestamp, event, sid, data in trace:
+        if speed:
+            delay = (timestamp - first_timestamp) / speed
+            delay -= time.perf_counter() - started
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        cid = data if event == "meld-init" else data["id"]
+        if cid not in app._components:
+            results.append({"event": event, "cid": cid, "missing": True})
+            continue
+
+        meter = {"size": 0, "render_ms": 0.0}
+        with _measured(app, meter):
+            start = time.perf_counter()
+            answer = await handlers[event](sid, data)
+            latency_ms = (time.perf_counter() - start) * 1e3
+        if answer is not None:
+            meter["size"] += len(orjson.dumps(answer))
+
+        results.append(
+            {
+                "event": event,
+                "cid": cid,
+                "latency_ms": latency_ms,
+                "render_ms": meter["render_ms"],
+                "size": meter["size"],
+            }
+        )
+    return results
+
+
+def summarize(results):
+    """
+    Aggregate replay results into comparable numbers.
+    """
+    results = [r for r in results if not r.get("missing")]
+    if not results:
+        return {"messages": 0}
+    latencies = sorted(r["latency_ms"] for r in results)
+    return {
+        "messages": len(results),
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_p95_ms": latencies[math.ceil(0.95 * len(latencies)) - 1],
+        "latency_max_ms": latencies[-1],
+        "render_total_ms": sum(r["render_ms"] for r in results),
+        "size_total": sum(r["size"] for r in results),
+    }
+
+
+def compare(summary, baseline):
+    """
+    Relative change of every summary value against a baseline summary.
+    """
+    return {
+        key: (value - baseline[key]) / baseline[key] if baseline.get(key) else None
+        for key, value in summary.items()
+        if key != "messages"
+    }
+
+
+def load_app(spec):
+    module_name, _, attr = spec.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr or "mt")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m meltree.replay", description=__doc__.strip().split("\n")[0]
+    )
+    parser.add_argument("app", help="app to replay on, as `module:attribute`")
+    parser.add_argument("trace", help="log written by the recorder")
+    parser.add_argument(
+        "--speed",
+        default="max",
+        help="`max` (default) or a factor of the original pace, e.g. 1.0",
+    )
+    parser.add_argument("--baseline", help="report of a previous run to compare to")
+    parser.add_argument("--output", help="file to write this run's report to")
+    args = parser.parse_args(argv)
+
+    app = load_app(args.app)
+    speed = None if args.speed == "max" else float(args.speed)
+    results = asyncio.run(replay(app, read_trace(args.trace), speed=speed))
+    report = {"summary": summarize(results), "results": results}
+
+    for key, value in report["summary"].items():
+        print(
+            f"{key:>16}: {value:.3f}" if type(value) is float else f"{key:>16}: {value}"
+        )
+
+    if args.baseline:
+        with open(args.baseline, "rb") as f:
+            baseline = orjson.loads(f.read())
+        print("versus baseline:")
+        for key, change in compare(report["summary"], baseline["summary"]).items():
+            if change is not None:
+                print(f"{key:>16}: {change:+.1%}")
+
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import struct
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+MAGIC = b"MTSNAP1\n"
+# cid length, payload length
+HEADER = struct.Struct("<HI")
+
+
+class SnapshotStore(object):
+    """
+    Append-only file of component attribute snapshots.
+
+    Each record holds the orjson encoded `_attributes()` of one component,
+    limited to the ones assigned on the instance, keyed by its cid. On startup
+    the latest record of each component is kept in memory and the others are
+    compacted away; a record is decoded and applied the first time its
+    component is requested. Encoding and writes happen on a single worker
+    thread so records keep their order.
+
+    Snapshots only survive restarts for components registered with an explicit
+    `cid`, since generated ones change on every run. Cids longer than 65535
+    bytes are not saved.
+
+    Attributes
+    ----------
+    path :
+        snapshot file path.
+    logger :
+        logger instance.
+    """
+
+    def __init__(self, path, logger=None):
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._payloads = {}  # cid -> payload of its latest record
+        self._restored = set()
+        self._records = 0
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            self.path.write_bytes(MAGIC)
+            return
+
+        data = self.path.read_bytes()
+        if not data.startswith(MAGIC):
+            self.logger.warning("ignoring invalid snapshot file %s", self.path)
+            self.path.write_bytes(MAGIC)
+            return
+
+        offset = len(MAGIC)
+        while offset + HEADER.size <= len(data):
+            cid_len, payload_len = HEADER.unpack_from(data, offset)
+            start = offset + HEADER.size + cid_len
+            if start + payload_len > len(data):
+                break
+            cid = data[offset + HEADER.size : start].decode("utf-8")
+            self._payloads[cid] = data[start : start + payload_len]
+            self._records += 1
+            offset = start + payload_len
+
+        if offset != len(data):
+            # drop a truncated record left by an interrupted write
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+        self._compact_if_stale()
+
+    def restore(self, component):
+        """
+        Apply the stored attributes to `component` once per run.
+        Returns True if a snapshot was applied.
+        """
+        cid = str(component.cid)
+        if cid in self._restored:
+            return False
+        self._restored.add(cid)
+        payload = self._payloads.get(cid)
+        if payload is None:
+            return False
+
+        for name, value in orjson.loads(payload).items():
+            try:
+                setattr(component, name, value)
+            except AttributeError:
+                # read-only attributes, e.g. `@computed` ones
+                pass
+        return True
+
+    def save(self, component):
+        """
+        Queue a record for `component`. The attributes assigned on the instance
+        are copied here and encoded on the worker thread, where the record is
+        skipped if they didn't change since the last one.
+
+        Returns:
+            the future of the write, resolving to True when a record was
+            written and False when nothing changed. None when the cid is too
+            long to be saved.
+        """
+        cid = str(component.cid)
+        self._restored.add(cid)
+        if len(cid.encode("utf-8")) > 0xFFFF:
+            self.logger.error("cid %.40s... is too long to be snapshotted", cid)
+            return None
+
+        excluded = set(component._bulk_names()) | set(component._shared_names())
+        attributes = {
+            name: value
+            for name, value in vars(component.__wrapped__).items()
+            if not name.startswith("_") and name not in excluded and not callable(value)
+        }
+        future = self._executor.submit(self._append, cid, attributes)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def _append(self, cid, attributes):
+        payload = orjson.dumps(attributes)
+        if self._payloads.get(cid) == payload:
+            return False
+        self._payloads[cid] = payload
+        cid_bytes = cid.encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(HEADER.pack(len(cid_bytes), len(payload)) + cid_bytes + payload)
+        self._records += 1
+        return True
+
+    def _log_failure(self, future):
+        if future.exception() is not None:
+            self.logger.error("snapshot write failed: %s", future.exception())
+
+    def compact(self):
+        """
+        Rewrite the file keeping only the latest record of each component.
+        """
+        records = [MAGIC]
+        for cid, payload in list(self._payloads.items()):
+            cid_bytes = cid.encode("utf-8")
+            records.append(HEADER.pack(len(cid_bytes), len(payload)))
+            records.append(cid_bytes + payload)
+
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_bytes(b"".join(records))
+        tmp_path.replace(self.path)
+        self._records = len(records) // 2
+
+    def close(self):
+        """
+        Wait for pending writes and compact the file if it holds stale records.
+        """
+        self._executor.submit(self._compact_if_stale).result()
+        self._executor.shutdown()
+
+    def _compact_if_stale(self):
+        if self._records > 2 * len(self._payloads):
+            self.compact()
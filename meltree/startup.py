@@ -0,0 +1,110 @@
+import time
+import socket
+import logging
+
+SPLASH_PATH = "/_meltree/splash"
+READY_PATH = "/_meltree/ready"
+
+# shown by the presenter while the app warms up. it long-polls the ready
+# route, backing off while the server is not up or not ready, and replaces
+# itself with the page of its `next` query parameter (the app root by default)
+# once the server answers 200.
+SPLASH = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Loading</title>
+<style>
+html, body { height: 100%; margin: 0; }
+body { display: flex; align-items: center; justify-content: center;
+       font-family: sans-serif; color: #666; }
+</style>
+</head>
+<body>
+<div>Loading&hellip;</div>
+<script>
+(async function wait() {
+  let next = new URLSearchParams(location.search).get("next") || "/";
+  if (!next.startsWith("/") || next.startsWith("//")) {
+    // only pages of this server
+    next = "/";
+  }
+  let delay = 100;
+  for (;;) {
+    try {
+      const response = await fetch("READY_PATH", { cache: "no-store" });
+      if (response.ok) break;
+    } catch (e) {
+      // the server is not listening yet
+    }
+    await new Promise((resolve) => setTimeout(resolve, delay));
+    delay = Math.min(2 * delay, 1000);
+  }
+  location.replace(next);
+})();
+</script>
+</body>
+</html>
+""".replace("READY_PATH", READY_PATH)
+
+
+class StartupTimeline(object):
+    """
+    Milestones of the application startup, logged with the time elapsed since
+    the timeline was created.
+    """
+
+    def __init__(self, logger=None, clock=time.perf_counter):
+        self.logger = logger or logging.getLogger(__name__)
+        self.clock = clock
+        self.started = clock()
+        self.marks = []  # [(label, seconds since start)]
+
+    def mark(self, label, once=False):
+        """
+        Record milestone `label`. with `once`, a label already recorded is
+        ignored. Returns the seconds since start, or None if ignored.
+        """
+        if once and any(name == label for name, _ in self.marks):
+            return None
+        elapsed = self.clock() - self.started
+        self.marks.append((label, elapsed))
+        self.logger.info("startup +%.1f ms: %s", elapsed * 1e3, label)
+        return elapsed
+
+    def summary(self):
+        """
+        Milestones as `{label: milliseconds since start}`.
+        """
+        return {label: round(elapsed * 1e3, 1) for label, elapsed in self.marks}
+
+
+def bind_socket(host=None, port=8080, backlog=128):
+    """
+    Bind and listen on a TCP socket before the server starts, so clients
+    connecting early wait in the backlog instead of being refused.
+    `port` 0 picks a free ephemeral port, `host` None binds all interfaces.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host or "", port))
+        sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+    sock.setblocking(False)
+    return sock
+
+
+def show_eel(host, port, size, page=SPLASH_PATH):
+    """
+    Open the eel window on `page` of the server. blocks until the browser
+    process is launched, call it from a thread.
+    """
+    import eel
+
+    # open browser. we have to make a small hack into eel
+    # and prevent it's local web server running
+    eel._start_args.update({"size": size, "port": port, "host": host})
+    eel.show(page.lstrip("/"))
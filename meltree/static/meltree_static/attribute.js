@@ -53,7 +53,8 @@ export class Attribute {
         if (
           actionEventType !== "id" &&
           actionEventType !== "name" &&
-          actionEventType !== "checksum"
+          actionEventType !== "checksum" &&
+          actionEventType !== "digest"
         ) {
           this.eventType = actionEventType;
         }
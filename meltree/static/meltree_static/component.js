@@ -1,4 +1,4 @@
-import {$, walk, isEmpty, socketio } from "./utils.js";
+import {$, walk, isEmpty, socketio, BULK_TYPES } from "./utils.js";
 import { Element } from "./element.js";
 import { morph } from "./morph.js"
 
@@ -15,6 +15,11 @@ export class Component {
     }
 
     this.data = args.data;
+    this.bulkNames = args.bulk || [];
+    this.bulk = {};
+    this._bulkPending = {};
+    // attribute name -> store key of shared attributes
+    this.shared = args.shared || {};
 
     this.document = args.document || document;
     this.walker = args.walker || walk;
@@ -26,11 +31,15 @@ export class Component {
 
     this.actionQueue = [];
     this.activeDebouncers = 0
+    // incremented by every optimistic model change, acknowledged by the server
+    this.version = 0;
 
     this.actionEvents = {};
     this.attachedEventTypes = [];
     this.attachedModelEvents = [];
     this.attachedCustomEvents = [];
+    // aborted when the component is destroyed to remove its document listeners
+    this.listenerController = new AbortController();
 
     this.init();
     this.refreshEventListeners();
@@ -76,10 +85,22 @@ export class Component {
         },
       };
 
+      // the input already shows the new value, apply it to the data as well
+      this.data[action.payload.name] = action.payload.value;
+      this.version += 1;
       this.checkComponentDefer(element, action);
     });
   }
 
+  /**
+   * Responses acknowledging an older version than the current one are stale:
+   * newer model changes are on their way and will get their own response.
+   * @param {number} version Version echoed by the server.
+   */
+  isStale(version) {
+    return version !== undefined && version < this.version;
+  }
+
   onResponseReceived(data, dom){
     this._onResponseCallbacks.forEach(callback => {
       console.log(callback.name);
@@ -100,6 +121,7 @@ export class Component {
    * @param {string} eventType Event type to listen for.
    */
   addActionEventListener(eventType) {
+    const { signal } = this.listenerController;
     this.document.addEventListener(eventType, (event) => {
       let targetElement = new Element(event.target, this);
 
@@ -143,7 +165,7 @@ export class Component {
           }
         });
       }
-    });
+    }, { signal });
   }
 
   /**
@@ -204,10 +226,21 @@ export class Component {
       this.name, 
       this.id,
       this.currentActionQueue,
-      this.data
+      this.data,
+      true,
+      this.version,
+      this.digest()
     );
   }
 
+  /**
+   * Digest of the html the component shows, set by the server on render.
+   */
+  digest() {
+    const root = $(`[meld\\:id="${this.id}"]`, this.document);
+    return root ? root.getAttribute("meld:digest") : null;
+  }
+
   updateData(component, newData, dom){
     let data = JSON.parse(newData);
     for (var key in data) {
@@ -215,6 +248,68 @@ export class Component {
     }
   }
 
+  /**
+   * Asks the server for every bulk attribute of the component.
+   */
+  requestBulk() {
+    if (this.bulkNames.length > 0) {
+      socketio.emit('meld-bulk', this.id);
+    }
+  }
+
+  /**
+   * Collects a chunk of a bulk attribute. Once every chunk has been received
+   * the value is exposed as a typed array and a `meld-bulk` event is dispatched.
+   * @param {Object} packet `meld-bulk` packet sent by the server.
+   */
+  receiveBulk(packet) {
+    let pending = this._bulkPending[packet.name];
+    if (!pending || packet.offset === 0) {
+      pending = { bytes: new Uint8Array(packet.nbytes), received: 0 };
+      this._bulkPending[packet.name] = pending;
+    }
+
+    const chunk = new Uint8Array(packet.chunk);
+    pending.bytes.set(chunk, packet.offset);
+    pending.received += chunk.byteLength;
+    if (pending.received < packet.nbytes) {
+      return;
+    }
+
+    delete this._bulkPending[packet.name];
+    const TypedArray = BULK_TYPES[packet.dtype] || Uint8Array;
+    const value = new TypedArray(pending.bytes.buffer);
+    value.shape = packet.shape;
+    this.bulk[packet.name] = value;
+
+    const event = new CustomEvent("meld-bulk", { detail: { id: this.id, name: packet.name } });
+    this.document.dispatchEvent(event);
+  }
+
+  /**
+   * Points the shared attributes reading `key` to its new value, which is the
+   * same object for every component, and dispatches a `meld-store` event.
+   * @param {string} key Store key.
+   * @param {*} value Value of the key.
+   */
+  receiveShared(key, value) {
+    Object.entries(this.shared).forEach(([name, sharedKey]) => {
+      if (sharedKey === key) {
+        this.data[name] = value;
+        const event = new CustomEvent("meld-store", { detail: { id: this.id, name, key } });
+        this.document.dispatchEvent(event);
+      }
+    });
+  }
+
+  /**
+   * Returns the typed array of a bulk attribute, `undefined` if not received yet.
+   * @param {string} name Name of the bulk attribute.
+   */
+  getBulk(name) {
+    return this.bulk[name];
+  }
+
   /**
    * Adds a custom event listener to the document for the given eventName.
    * @param {string} eventName Name of the custom meld-event to be listened for
@@ -226,7 +321,16 @@ export class Component {
       var method = { type: "callMethod", payload: { name: funcName, message: event.detail } };
       this.actionQueue.push(method);
       this.queueMessage(element.model);
-    });
+    }, { signal: this.listenerController.signal });
+  }
+
+  /**
+   * Removes the document level listeners of a component which left the page.
+   */
+  destroy() {
+    this.listenerController.abort();
+    clearTimeout(this.debounce_timer);
+    this.actionQueue = [];
   }
 
   queueMessage(model, callback) {
@@ -267,25 +371,7 @@ export class Component {
       throw Error("No id found");
     }
 
-    /**
-     * Add the custom listeners from the python class
-     * This separate helper function is needed because "this" doesn't
-     * work in the socketio.emit callback (it refers to the socketio
-     * object).
-     */
-     function addListeners(component, response) {
-      Object.entries(response).forEach(([eventName, funcNames]) => {
-        component.attachedCustomEvents.push(eventName)
-        funcNames.forEach((funcName) => {
-          component.addCustomEventListener(eventName, funcName)
-        })
-      })
-    }
-
-    socketio.emit(
-      'meld-init', this.id,
-      (response) => addListeners(this, response)
-    )
+    // listeners are attached by `Meld.componentInit` with a single meld-init
   }
 
   refreshEventListeners() {
@@ -343,6 +429,10 @@ export class Component {
   }
 
   updateDOM(scope, data, dom) {
+    if (dom === undefined) {
+      // the server output matches what the client shows already
+      return;
+    }
     var componentRoot = $(`[meld\\:id="${scope.id}"]`);
     morph(componentRoot, dom);
     scope.refreshEventListeners()
@@ -1,9 +1,102 @@
 import { Component } from "./component.js";
-import { socketio } from "./utils.js";
+import { socketio, session, cacheListeners } from "./utils.js";
+import { navigate, enableNavigation } from "./navigate.js";
 
 export var Meld = (function () {
   var meld = {};  // contains all methods exposed publicly in the meld object
   const components = {};
+  let visibilityTimer = null;
+  // shared store values, one copy per key: key -> {version, value}
+  const store = {};
+  const storeKeys = new Set();
+  const pendingKeys = new Set();
+  // components reading store keys, re-rendered by the server on changes
+  const storeComponents = new Set();
+  const pendingComponents = new Set();
+  let storeTimer = null;
+
+  /*
+    Tells the server which components are shown and if the page is visible,
+    so `@poll` methods only run for what users can see.
+    */
+  function reportVisibility() {
+    clearTimeout(visibilityTimer);
+    // batch the reports of components initialized together
+    visibilityTimer = setTimeout(() => {
+      socketio.emit('meld-visibility', {
+        visible: document.visibilityState === 'visible',
+        components: Object.keys(components),
+      });
+    }, 0);
+  }
+
+  /*
+    Asks the server for the store keys read by components, sending the
+    versions already received. Later changes of the keys are pushed by the
+    server with `meld-store` events, and the components reading them are
+    sent again.
+    */
+  function subscribe(keys, componentIds) {
+    keys.forEach((key) => {
+      storeKeys.add(key);
+      pendingKeys.add(key);
+    });
+    componentIds.forEach((componentId) => {
+      storeComponents.add(componentId);
+      pendingComponents.add(componentId);
+    });
+    clearTimeout(storeTimer);
+    // batch the keys of components initialized together
+    storeTimer = setTimeout(() => {
+      const known = {};
+      pendingKeys.forEach((key) => {
+        known[key] = store[key] ? store[key].version : 0;
+      });
+      const componentIds = [...pendingComponents];
+      pendingKeys.clear();
+      pendingComponents.clear();
+      socketio.emit(
+        'meld-store', { keys: known, components: componentIds },
+        (entries) => entries.forEach(receiveShared)
+      );
+    }, 0);
+  }
+
+  function receiveShared(entry) {
+    const current = store[entry.key];
+    if (current && current.version >= entry.version) {
+      return
+    }
+    store[entry.key] = { version: entry.version, value: JSON.parse(entry.value) };
+    Object.values(components).forEach((component) => {
+      component.receiveShared(entry.key, store[entry.key].value);
+    });
+  }
+
+  function handleResponse(responseJson) {
+    if (!responseJson) {
+      return
+    }
+    if (responseJson.error) {
+      console.error(responseJson.error);
+      return
+    }
+    if (!components[responseJson.id])
+      return
+    else if(components[responseJson.id].actionQueue.length > 0)
+      return
+    else if(components[responseJson.id].isStale(responseJson.version))
+      return
+
+    if (responseJson.redirect) {
+      window.location.href = responseJson.redirect.url;
+    }
+
+    let component = components[responseJson.id];
+    if (component ){
+      component.onResponseReceived(responseJson.data, responseJson.dom);
+    }
+  }
 
   /*
     Initializes the meld object.
@@ -12,25 +105,30 @@ export var Meld = (function () {
 
     socketio.on('meld-response', function(responseJson) {
       console.debug('New meld-reponse received');
-      if (!responseJson) {
-        return
-      }
-      if (responseJson.error) {
-        console.error(responseJson.error);
-        return
-      }
-      if (!components[responseJson.id])
-        return
-      else if(components[responseJson.id].actionQueue.length > 0)
-        return
+      handleResponse(responseJson);
+    });
+
+    // updates of every polled component of a tick, applied in one frame
+    socketio.on('meld-frame', function(frame) {
+      requestAnimationFrame(() => frame.forEach(handleResponse));
+    });
+
+    socketio.on('connect', reportVisibility);
 
-      if (responseJson.redirect) {
-        window.location.href = responseJson.redirect.url;
+    socketio.on('meld-store', receiveShared);
+    let connected = false;
+    socketio.on('connect', function() {
+      // subscriptions are per connection, renew them after reconnecting
+      if (connected && storeKeys.size > 0) {
+        subscribe([...storeKeys], [...storeComponents]);
       }
+      connected = true;
+    });
+    document.addEventListener('visibilitychange', reportVisibility);
 
-      let component = components[responseJson.id];
-      if (component ){
-        component.onResponseReceived(responseJson.data, responseJson.dom);
+    socketio.on('meld-bulk', function(packet) {
+      if (components[packet.id]) {
+        components[packet.id].receiveBulk(packet);
       }
     });
 
@@ -38,6 +136,8 @@ export var Meld = (function () {
       var event = new CustomEvent(payload.event, { detail: payload.message })
       document.dispatchEvent(event)
     });
+
+    enableNavigation(meld);
   }
 
 
@@ -48,31 +148,86 @@ meld.componentInit = function (args) {
   const component = new Component(args);
   component.registerManager(this);
   console.log(component.id);
-  socketio.emit(
-    // 'meld-init', component.name,
-    'meld-init', component.id,
-    (response) => {
-      Object.entries(response).forEach(([eventName, funcNames]) => {
-        /**
-         * Add the custom listeners from the python class
-         * This separate helper function is needed because "this" doesn't
-         * work in the socketio.emit callback (it refers to the socketio
-         * object).
-         */
-        component.attachedCustomEvents.push(eventName)
-        funcNames.forEach((funcName) => {
-          component.addCustomEventListener(eventName, funcName)
-        })
-      });
-    }
-  )
+
+  /**
+   * Add the custom listeners from the python class
+   * This separate helper function is needed because "this" doesn't
+   * work in the socketio.emit callback (it refers to the socketio
+   * object).
+   */
+  const addListeners = (response) => {
+    Object.entries(response).forEach(([eventName, funcNames]) => {
+      component.attachedCustomEvents.push(eventName)
+      funcNames.forEach((funcName) => {
+        component.addCustomEventListener(eventName, funcName)
+      })
+    });
+  };
+
+  if (session.token && session.listeners[component.id]) {
+    // resumed session: the server already knows this component
+    addListeners(session.listeners[component.id]);
+  } else {
+    socketio.emit(
+      'meld-init', component.id,
+      (response) => {
+        cacheListeners(component.id, response);
+        addListeners(response);
+      }
+    )
+  }
   components[component.id] = component;
+  component.requestBulk();
+  const keys = Object.values(component.shared);
+  keys.forEach((key) => {
+    if (store[key]) {
+      component.receiveShared(key, store[key].value);
+    }
+  });
+  if (keys.length > 0) {
+    subscribe(keys.filter((key) => !storeKeys.has(key)), [component.id]);
+  }
+  reportVisibility();
+};
+
+/*
+Stops a component which was removed from the page.
+*/
+meld.componentDestroy = function(componentId) {
+  if (components[componentId]) {
+    components[componentId].destroy();
+    delete components[componentId];
+    storeComponents.delete(componentId);
+    reportVisibility();
+  }
+};
+
+/*
+Navigates to `url` without reloading the page.
+*/
+meld.navigate = function(url) {
+  return navigate(meld, url);
+};
+
+/*
+Returns the typed array of a bulk attribute of a component.
+*/
+meld.getBulk = function(componentId, name) {
+  const component = components[componentId];
+  return component ? component.getBulk(name) : undefined;
+};
+
+/*
+Returns the value of a shared store key, `undefined` if not received yet.
+*/
+meld.getShared = function(key) {
+  return store[key] ? store[key].value : undefined;
 };
 
 /*
 Handles calling the message endpoint and merging the results into the document.
 */
-meld.sendMessage = function(componentName, componentId, componentActionQueue, data, renderDOM) {
+meld.sendMessage = function(componentName, componentId, componentActionQueue, data, renderDOM, version, digest) {
   renderDOM = renderDOM !== undefined? renderDOM:true;
   
   socketio.emit(
@@ -83,6 +238,8 @@ meld.sendMessage = function(componentName, componentId, componentActionQueue, da
       'componentName': componentName,
       'data': data,
       'renderDOM': renderDOM,
+      'version': version,
+      'digest': digest,
     });
 }
 
@@ -0,0 +1,155 @@
+import { socketio } from "./utils.js";
+import { morph } from "./morph.js";
+
+/*
+In-page navigation over the meld socket.
+
+Links with a `meld:navigate` attribute ask the server to render their target
+route with a `meld-navigate` message, and the `[meld:page]` container of the
+result is morphed into the current page. Components mounted on both pages are
+kept as they are; the init scripts of new ones run when they are added.
+`meld:navigate.prefetch` also requests the page when the link is hovered.
+
+A full navigation is done when the page has no `[meld:page]` container, or
+the server can't render the target.
+*/
+
+const PAGE_SELECTOR = "[meld\\:page]";
+const COMPONENT_SELECTOR = "[meld\\:id]";
+const PREFETCH_TTL = 5000;
+const MAX_REDIRECTS = 5;
+
+const prefetched = {}; // url -> { time, response }
+
+function request(url) {
+  return new Promise((resolve) => socketio.emit("meld-navigate", url, resolve));
+}
+
+function isFresh(entry) {
+  return entry && Date.now() - entry.time < PREFETCH_TTL;
+}
+
+function fetchPage(url) {
+  url = url.split("#")[0];
+  const entry = prefetched[url];
+  delete prefetched[url];
+  return isFresh(entry) ? entry.response : request(url);
+}
+
+/*
+Requests `url` ahead of a navigation. The response is used if the navigation
+happens within a few seconds.
+*/
+export function prefetch(url) {
+  if (!isFresh(prefetched[url]) && socketio.connected) {
+    prefetched[url] = { time: Date.now(), response: request(url) };
+  }
+}
+
+function componentIds(el) {
+  return new Set(
+    Array.from(el.querySelectorAll(COMPONENT_SELECTOR), (c) => c.getAttribute("meld:id"))
+  );
+}
+
+/*
+Replaces the page container with the one of `url`.
+*/
+export async function navigate(manager, url, push = true, redirects = 0) {
+  const container = document.querySelector(PAGE_SELECTOR);
+  const response = container && socketio.connected ? await fetchPage(url) : {};
+
+  if (response.redirect && redirects < MAX_REDIRECTS) {
+    return navigate(manager, response.redirect, push, redirects + 1);
+  }
+  const page = response.html
+    ? new DOMParser().parseFromString(response.html, "text/html")
+    : null;
+  const next = page && page.querySelector(PAGE_SELECTOR);
+  if (!next) {
+    window.location.href = url;
+    return;
+  }
+
+  if (push) {
+    history.pushState({ meldNavigate: true }, "", url);
+  }
+  if (page.title) {
+    document.title = page.title;
+  }
+
+  const mounted = componentIds(container);
+  const incoming = componentIds(next);
+  mounted.forEach((id) => {
+    if (!incoming.has(id)) {
+      manager.componentDestroy(id);
+    }
+  });
+
+  await morph(container, next.outerHTML, {
+    key: (el) => el.getAttribute("meld:id") || el.getAttribute("key"),
+    updating: (from, to, childrenOnly, skip) => {
+      // keep components which are on both pages alive
+      if (
+        from.nodeType === Node.ELEMENT_NODE &&
+        mounted.has(from.getAttribute("meld:id")) &&
+        from.getAttribute("meld:id") === to.getAttribute("meld:id")
+      ) {
+        skip();
+      }
+    },
+  });
+  if (push) {
+    window.scrollTo(0, 0);
+  }
+}
+
+function navigationLink(event) {
+  const link = event.target.closest && event.target.closest("a[href]");
+  if (
+    !link ||
+    !(link.hasAttribute("meld:navigate") || link.hasAttribute("meld:navigate.prefetch")) ||
+    link.origin !== window.location.origin
+  ) {
+    return null;
+  }
+  return link;
+}
+
+/*
+Handles clicks on `meld:navigate` links and the browser history.
+*/
+export function enableNavigation(manager) {
+  document.addEventListener("click", (event) => {
+    const link = navigationLink(event);
+    if (
+      !link ||
+      event.defaultPrevented ||
+      event.button !== 0 ||
+      event.metaKey ||
+      event.ctrlKey ||
+      event.shiftKey ||
+      event.altKey ||
+      link.target
+    ) {
+      return;
+    }
+    event.preventDefault();
+    navigate(manager, link.pathname + link.search + link.hash);
+  });
+
+  document.addEventListener("mouseover", (event) => {
+    const link = navigationLink(event);
+    if (link && link.hasAttribute("meld:navigate.prefetch")) {
+      prefetch(link.pathname + link.search);
+    }
+  });
+
+  // mark the entry of the initial page, to come back to it with popstate
+  history.replaceState({ meldNavigate: true }, "");
+  window.addEventListener("popstate", (event) => {
+    if (event.state && event.state.meldNavigate) {
+      navigate(manager, window.location.pathname + window.location.search, false);
+    }
+  });
+}
@@ -1,4 +1,61 @@
-export var socketio = io();
+const SESSION_KEY = "meltree-session";
+
+/*
+Connection options rendered by the server with `{{ meltree_options() }}`.
+*/
+function readOptions() {
+  const meta = document.querySelector('meta[name="meltree-options"]');
+  return meta ? JSON.parse(meta.content) : {};
+}
+
+const options = readOptions();
+
+// apps hosted on a shared MelTreeServer have their own namespace
+export var socketio = io(options.namespace || "/", {
+  transports: options.transports || undefined,
+  upgrade: options.upgrade !== false,
+  // sent on every (re)connection so the server can resume the session
+  auth: (cb) => cb({ token: sessionStorage.getItem(SESSION_KEY) }),
+});
+
+/*
+Session state shared by components. `listeners` caches the meld-init responses
+per component id, so a resumed session doesn't initialize components again.
+*/
+export var session = {
+  token: sessionStorage.getItem(SESSION_KEY),
+  listeners: JSON.parse(sessionStorage.getItem(`${SESSION_KEY}-listeners`) || "{}"),
+};
+
+socketio.on("meld-session", function (payload) {
+  if (!payload.resumed) {
+    session.listeners = {};
+    sessionStorage.removeItem(`${SESSION_KEY}-listeners`);
+  }
+  session.token = payload.token;
+  sessionStorage.setItem(SESSION_KEY, payload.token);
+});
+
+export function cacheListeners(componentId, listeners) {
+  session.listeners[componentId] = listeners;
+  sessionStorage.setItem(`${SESSION_KEY}-listeners`, JSON.stringify(session.listeners));
+}
+
+/*
+Typed array constructors for the dtypes of `meld-bulk` packets.
+*/
+export const BULK_TYPES = {
+  int8: Int8Array,
+  uint8: Uint8Array,
+  int16: Int16Array,
+  uint16: Uint16Array,
+  int32: Int32Array,
+  uint32: Uint32Array,
+  int64: BigInt64Array,
+  uint64: BigUint64Array,
+  float32: Float32Array,
+  float64: Float64Array,
+};
 /*
 Traverse the DOM looking for child elements.
 */
@@ -0,0 +1,78 @@
+import threading
+
+import orjson
+
+
+class Store(object):
+    """
+    Values shared by the components of an app, keyed by name.
+
+    Each key holds one copy of its value and a version, incremented by every
+    `set`. Components read keys through `shared` attributes and are recorded as
+    subscribers of them, so a change only re-renders the components reading the
+    key. Clients receive the value once per version, see `MelTree.publish_shared`.
+
+    Re-assign a key to publish a new value; in-place mutations are not detected.
+
+    Attributes
+    ----------
+    on_change :
+        called with the key and its new version after every `set`, from the
+        thread which set it.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self._entries = {}  # key -> (value, version)
+        self._encoded = {}  # key -> (version, json)
+        self._subscribers = {}  # key -> set of cids
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        return list(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        return default if entry is None else entry[0]
+
+    def version(self, key):
+        """
+        Version of `key`, 0 if it was never set.
+        """
+        entry = self._entries.get(key)
+        return 0 if entry is None else entry[1]
+
+    def set(self, key, value):
+        """
+        Store `value` under `key` and return its new version.
+        """
+        with self._lock:
+            version = self.version(key) + 1
+            self._entries[key] = (value, version)
+        if self.on_change is not None:
+            self.on_change(key, version)
+        return version
+
+    def encoded(self, key):
+        """
+        Version of `key` and its value as JSON, serialized once per version.
+        """
+        with self._lock:
+            value, version = self._entries.get(key, (None, 0))
+            cached = self._encoded.get(key)
+            if cached is None or cached[0] != version:
+                cached = (version, orjson.dumps(value).decode("utf-8"))
+                self._encoded[key] = cached
+        return cached
+
+    def subscribe(self, key, cid):
+        self._subscribers.setdefault(key, set()).add(cid)
+
+    def subscribers(self, key):
+        """
+        Cids of the components reading `key`.
+        """
+        return list(self._subscribers.get(key, ()))
@@ -14,6 +14,8 @@ def MeldTag(manager):
 
 class BaseMeldTag(StandaloneTag):
     tags = {"meld"}
+    # rendered components are html, don't let autoescaping escape them
+    safe_output = True
     session_manager = None
 
     def render(self, obj, **kwargs):
@@ -23,7 +25,9 @@ class BaseMeldTag(StandaloneTag):
 
         # component = self.session_manager.get_component(obj.cid)
         # import pdb; pdb.set_trace()
-        component = self.session_manager.get_component(id(obj))  # TODO: refactor
+        # components are referred to by cid, or by the registered object itself
+        cid = obj if isinstance(obj, str) else id(obj)
+        component = self.session_manager.get_component(cid)
         rendered_component = component.render()
 
         return rendered_component
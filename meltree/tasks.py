@@ -0,0 +1,309 @@
+import time
+import heapq
+import asyncio
+import logging
+import functools
+import itertools
+import threading
+
+from meltree.message import thread_pool
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITIES = {"interactive": INTERACTIVE, "batch": BATCH}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+
+def _is_async(func):
+    return asyncio.iscoroutinefunction(func) or asyncio.iscoroutinefunction(
+        getattr(type(func), "__call__", None)
+    )
+
+
+class ScheduledTask(object):
+    """
+    A unit of work submitted to a `TaskScheduler`.
+
+    Attributes
+    ----------
+    id :
+        increasing task id, also the FIFO order within a priority.
+    key :
+        concurrency group, the component class name for component methods.
+    priority :
+        `INTERACTIVE` or `BATCH`.
+    sid :
+        SocketIO session the task belongs to, cancelled when it disconnects.
+    name :
+        label shown in `TaskScheduler.status`.
+    context :
+        object passed along to the scheduler's `on_done`, e.g. the component.
+    """
+
+    __slots__ = (
+        "id",
+        "key",
+        "priority",
+        "sid",
+        "name",
+        "context",
+        "func",
+        "args",
+        "kwargs",
+        "future",
+        "task",
+        "submitted",
+        "started",
+    )
+
+    def __init__(self, id, func, args, kwargs, key, priority, sid, name, context):
+        self.id = id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.priority = priority
+        self.sid = sid
+        self.name = name or getattr(func, "__qualname__", repr(func))
+        self.context = context
+        self.future = None
+        self.task = None
+        self.submitted = time.monotonic()
+        self.started = None
+
+    def info(self):
+        now = time.monotonic()
+        return {
+            "id": self.id,
+            "key": self.key,
+            "name": self.name,
+            "priority": PRIORITY_NAMES.get(self.priority, self.priority),
+            "sid": self.sid,
+            "waited": (self.started or now) - self.submitted,
+            "running": now - self.started if self.started is not None else None,
+        }
+
+
+class TaskScheduler(object):
+    """
+    Supervised background tasks of a MelTree app.
+
+    Tasks are grouped by `key` and at most `limit` tasks of a group run at
+    once; the others wait in a queue ordered by priority, then submission.
+    Coroutine functions run on the event loop, other callables in the message
+    thread pool. Tasks are cancelled when their session disconnects or the
+    app shuts down.
+
+    `submit` can be called from the event loop, which returns an asyncio
+    future, or from any other thread, which returns a
+    `concurrent.futures.Future`. Cancelling either cancels the task.
+
+    Attributes
+    ----------
+    limit :
+        default number of concurrent tasks per key.
+    limits :
+        per key overrides of `limit`.
+    on_done :
+        optional coroutine function awaited with every task which completed
+        without being cancelled.
+    loop :
+        event loop tasks run on. bound on the first submission from a loop,
+        or with `bind`.
+    """
+
+    def __init__(self, limit=4, logger=None, on_done=None):
+        self.limit = limit
+        self.limits = {}
+        self.logger = logger or logging.getLogger(__name__)
+        self.on_done = on_done
+        self.loop = None
+        self.closed = False
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queues = {}  # key -> heap of (priority, id, task)
+        self._running = {}  # id -> task
+        self._counts = {}  # key -> number of running tasks
+
+    def bind(self, loop):
+        self.loop = loop
+        self.closed = False
+
+    def set_limit(self, key, limit):
+        """
+        Run at most `limit` tasks of `key` at once.
+        """
+        self.limits[key] = limit
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._pump, key)
+
+    def submit(
+        self,
+        func,
+        args=(),
+        kwargs=None,
+        *,
+        key="default",
+        priority=INTERACTIVE,
+        sid=None,
+        name=None,
+        context=None,
+    ):
+        """
+        Queue `func(*args, **kwargs)`.
+
+        Params:
+            func (callable): coroutine function, or sync callable.
+            key (str): concurrency group.
+            priority (int|str): `INTERACTIVE`/`"interactive"` or `BATCH`/`"batch"`.
+            sid (str): session to tie the task to.
+            name (str): label shown in `status`.
+            context: passed along to `on_done` through the task.
+
+        Returns:
+            future of the result.
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if self.loop is None:
+            if running_loop is None:
+                raise RuntimeError("task scheduler is not bound to an event loop")
+            self.bind(running_loop)
+
+        task = ScheduledTask(
+            next(self._ids),
+            func,
+            tuple(args),
+            kwargs or {},
+            key,
+            PRIORITIES.get(priority, priority),
+            sid,
+            name,
+            context,
+        )
+        if running_loop is self.loop:
+            return self._enqueue(task)
+
+        async def wait():
+            return await self._enqueue(task)
+
+        return asyncio.run_coroutine_threadsafe(wait(), self.loop)
+
+    def _enqueue(self, task):
+        task.future = self.loop.create_future()
+        if self.closed:
+            task.future.cancel()
+            return task.future
+        task.future.add_done_callback(_cancel_task(task))
+        with self._lock:
+            queue = self._queues.setdefault(task.key, [])
+            heapq.heappush(queue, (task.priority, task.id, task))
+        self._pump(task.key)
+        return task.future
+
+    def _pump(self, key):
+        with self._lock:
+            queue = self._queues.get(key)
+            limit = self.limits.get(key, self.limit)
+            while queue and self._counts.get(key, 0) < limit:
+                _, _, task = heapq.heappop(queue)
+                if task.future.done():
+                    # cancelled while queued
+                    continue
+                self._counts[key] = self._counts.get(key, 0) + 1
+                self._running[task.id] = task
+                task.started = time.monotonic()
+                task.task = self.loop.create_task(self._run(task))
+                task.task.add_done_callback(lambda _, task=task: self._finish(task))
+            if not queue:
+                self._queues.pop(key, None)
+
+    async def _run(self, task):
+        if _is_async(task.func):
+            result = await task.func(*task.args, **task.kwargs)
+        else:
+            call = functools.partial(task.func, *task.args, **task.kwargs)
+            result = await asyncio.wrap_future(thread_pool.submit(call))
+        if not task.future.done():
+            task.future.set_result(result)
+        if self.on_done is not None:
+            await self.on_done(task)
+
+    def _finish(self, task):
+        # a done callback, so it also runs for tasks cancelled before starting
+        with self._lock:
+            self._running.pop(task.id, None)
+            self._counts[task.key] -= 1
+            if not self._counts[task.key]:
+                del self._counts[task.key]
+
+        if task.task.cancelled():
+            task.future.cancel()
+        elif task.task.exception() is not None:
+            e = task.task.exception()
+            self.logger.error("task %s failed", task.name, exc_info=e)
+            if not task.future.done():
+                task.future.set_exception(e)
+        if not self.closed:
+            self._pump(task.key)
+
+    def cancel_session(self, sid):
+        """
+        Cancel queued and running tasks of session `sid`.
+        Returns the number of cancelled tasks.
+        """
+        return self._cancel(lambda task: task.sid == sid)
+
+    def _cancel(self, match):
+        with self._lock:
+            queued = [t for q in self._queues.values() for _, _, t in q if match(t)]
+            running = [t for t in self._running.values() if match(t)]
+        for task in queued:
+            task.future.cancel()
+        for task in running:
+            task.task.cancel()
+        return len(queued) + len(running)
+
+    async def shutdown(self):
+        """
+        Cancel every task and wait for the running ones to finish.
+        """
+        self.closed = True
+        with self._lock:
+            running = [t.task for t in self._running.values()]
+        self._cancel(lambda task: True)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def status(self):
+        """
+        Running and queued tasks, safe to call from any thread.
+        """
+        with self._lock:
+            running = [t.info() for t in self._running.values()]
+            queued = [
+                t.info()
+                for q in self._queues.values()
+                for _, _, t in sorted(q)
+                if not t.future.done()
+            ]
+        return {"running": running, "queued": queued}
+
+
+def _cancel_task(task):
+    """
+    Done callback of a task future: a cancelled future cancels the running task.
+    """
+
+    def callback(future):
+        if future.cancelled():
+            if task.task is not None:
+                task.task.cancel()
+        else:
+            # failures are logged by `_finish`, retrieve the exception so
+            # futures nobody awaits, e.g. of `@background` methods, don't warn
+            future.exception()
+
+    return callback
@@ -18,11 +18,45 @@ def async_manager():
 
 
 @pytest.fixture
-def mt():
+def app_cache():
+    """
+    Empty registry of MelTree apps, emptied again after the test.
+    """
     MelTree.cache = {}
+    yield MelTree.cache
+    MelTree.cache.clear()
+
+
+@pytest.fixture
+def mt(app_cache):
     return MelTree()
 
 
 @pytest.fixture
 def mt_singleton():
     return MelTree()
+
+
+class Emitted(list):
+    """
+    Events emitted by the SocketIO server of the app, as `(event, data, to)`.
+    `namespaces` holds the namespace of each event, `skipped` its `skip_sid`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.namespaces = []
+        self.skipped = []
+
+
+@pytest.fixture
+def emitted(mt):
+    events = Emitted()
+
+    async def emit(event, data=None, to=None, namespace=None, skip_sid=None, **kw):
+        events.append((event, data, to))
+        events.namespaces.append(namespace)
+        events.skipped.append(skip_sid)
+
+    mt.sio_server.emit = emit
+    return events
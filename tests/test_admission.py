@@ -0,0 +1,129 @@
+import pytest
+import asyncio
+
+from meltree.admission import (
+    AdmissionController,
+    classify,
+    CLICK,
+    EVENT,
+    INIT,
+    SYNC,
+)
+
+
+def message(cid, *actions):
+    return {"id": cid, "componentName": "Form", "actionQueue": list(actions)}
+
+
+def sync(name, value):
+    return {"type": "syncInput", "payload": {"name": name, "value": value}}
+
+
+def click(name):
+    return {"type": "callMethod", "payload": {"name": name}}
+
+
+def callback(name, detail):
+    return {"type": "callMethod", "payload": {"name": name, "message": detail}}
+
+
+def test_classify():
+    assert classify("meld-init", "Form:1") == INIT
+    assert classify("meld-message", message("a", sync("x", 1), click("save"))) == CLICK
+    assert classify("meld-message", message("a", sync("x", 1))) == SYNC
+    assert classify("meld-message", message("a", callback("tick", {}))) == EVENT
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_coalesces_syncs():
+    admission = AdmissionController(rate=1000, burst=1)
+    now = [0.0]
+    admission.clock = lambda: now[0]
+
+    first = message("a", sync("name", "a"))
+    assert await admission.admit("s1", "meld-message", first) is first
+    admission.release()
+
+    # the bucket is empty: the next syncs wait and are merged
+    waiting = asyncio.ensure_future(
+        admission.admit("s1", "meld-message", message("a", sync("name", "ab")))
+    )
+    await asyncio.sleep(0)
+    later = message("a", sync("name", "abc"), sync("age", 3))
+    assert await admission.admit("s1", "meld-message", later) is None
+
+    now[0] = 1.0
+    merged = await waiting
+    assert merged["actionQueue"] == [sync("name", "abc"), sync("age", 3)]
+    admission.release()
+
+    stats = admission.stats()
+    assert stats["admitted"] == {"sync": 2}
+    assert stats["coalesced"] == {"sync": 1}
+    assert stats["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_priority_and_shedding():
+    admission = AdmissionController(max_inflight=1, max_queue=2)
+    busy = message("a", click("save"))
+    assert await admission.admit("s1", "meld-message", busy) is busy
+
+    order = []
+
+    async def admit(sid, event, msg):
+        result = await admission.admit(sid, event, msg)
+        order.append(result if result is None else event)
+
+    event_msg = message("b", callback("tick", {"n": 1}))
+    tasks = [
+        asyncio.ensure_future(admit("s2", "meld-message", event_msg)),
+        asyncio.ensure_future(admit("s3", "meld-message", message("c", sync("x", 1)))),
+        asyncio.ensure_future(admit("s4", "meld-init", "Form:1")),
+    ]
+    for _ in range(2):
+        await asyncio.sleep(0)
+    # the queue was full, so the waiting event callback was shed
+    assert order == [None]
+
+    for _ in range(2):
+        admission.release()
+        await asyncio.sleep(0)
+    admission.release()
+    await asyncio.gather(*tasks)
+    assert order == [None, "meld-init", "meld-message"]
+    assert admission.stats()["shed"] == {"event": 1}
+
+
+@pytest.mark.asyncio
+async def test_session_order():
+    admission = AdmissionController(max_inflight=1)
+    busy = message("z", click("load"))
+    assert await admission.admit("s0", "meld-message", busy) is busy
+
+    order = []
+
+    async def admit(sid, msg):
+        result = await admission.admit(sid, "meld-message", msg)
+        order.append((sid, result["actionQueue"]))
+
+    tasks = [
+        asyncio.ensure_future(admit("s1", message("a", sync("x", 1)))),
+        asyncio.ensure_future(admit("s2", message("c", callback("tick", {})))),
+        asyncio.ensure_future(admit("s1", message("a", click("save")))),
+        # typed after the click: not merged into the sync sent before it
+        asyncio.ensure_future(admit("s1", message("a", sync("x", 2)))),
+    ]
+    await asyncio.sleep(0)
+
+    for _ in range(4):
+        admission.release()
+        await asyncio.sleep(0)
+    admission.release()
+    await asyncio.gather(*tasks)
+    assert order == [
+        ("s1", [sync("x", 1)]),
+        ("s1", [click("save")]),
+        ("s1", [sync("x", 2)]),
+        ("s2", [callback("tick", {})]),
+    ]
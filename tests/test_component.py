@@ -0,0 +1,128 @@
+import pytest
+from array import array
+from pathlib import Path
+
+from meltree import bulk, computed
+from meltree.component import ComponentProxy
+
+
+@bulk("samples", "raw")
+class BulkComponent:
+    template_path = Path(__file__).name
+    title = "chart"
+    samples = [0.5, 1.5, 2.5]
+    raw = array("i", range(10))
+
+
+def test_bulk_excluded_from_attributes():
+    component = ComponentProxy(BulkComponent())
+    attributes = component._attributes()
+    assert attributes["title"] == "chart"
+    assert "samples" not in attributes
+    assert "raw" not in attributes
+    assert attributes["errors"] == {}
+
+
+def test_proxy_state_assignable():
+    component = ComponentProxy(BulkComponent())
+    component.errors = {"title": "required"}
+    component.template_path = "other.html"
+    assert component._attributes()["errors"] == {"title": "required"}
+    assert component.template_path == "other.html"
+    # kept on the proxy
+    assert BulkComponent.template_path == Path(__file__).name
+
+
+def test_bulk_chunks():
+    component = ComponentProxy(BulkComponent())
+    packets = list(component._bulk_chunks(chunk_size=16, names=["raw"]))
+
+    assert [p["offset"] for p in packets] == [0, 16, 32]
+    assert {p["dtype"] for p in packets} == {"int32"}
+    assert packets[0]["shape"] == [10]
+    assert b"".join(p["chunk"] for p in packets) == BulkComponent.raw.tobytes()
+
+
+def test_bulk_changed():
+    component = ComponentProxy(BulkComponent())
+    assert component._bulk_changed() == ["samples", "raw"]
+
+    list(component._bulk_chunks(chunk_size=1024))
+    assert component._bulk_changed() == []
+
+    component.samples = [4.0]
+    assert component._bulk_changed() == ["samples"]
+    (packet,) = component._bulk_chunks(chunk_size=1024, names=["samples"])
+    assert packet["dtype"] == "float64"
+    assert array("d", packet["chunk"]).tolist() == [4.0]
+
+    # values re-assigned twice between sends are detected even if the new one
+    # would get the id of the value sent last
+    for i in range(100):
+        component.samples = [float(i)]
+        component.samples = [float(i), 1.0]
+        assert component._bulk_changed() == ["samples"]
+        list(component._bulk_chunks(chunk_size=1024, names=["samples"]))
+
+
+class Cart:
+    template_path = Path(__file__).name
+    prices = (1, 2, 3)
+    discount = 0
+    label = "cart"
+    calls = 0
+
+    @computed
+    def total(self):
+        self.calls += 1
+        return sum(self.prices) - self.discount
+
+    @computed
+    def summary(self):
+        return f"{self.label}: {self.total}"
+
+
+def test_computed_cached_and_serialized():
+    component = ComponentProxy(Cart())
+    assert component._attributes()["total"] == 6
+    assert component._attributes()["summary"] == "cart: 6"
+    assert component.calls == 1
+
+
+def test_computed_invalidation():
+    component = ComponentProxy(Cart())
+    assert component.summary == "cart: 6"
+
+    component.label = "basket"
+    assert component.summary == "basket: 6"
+    assert component.calls == 1
+
+    component.discount = 2
+    assert component.summary == "basket: 4"
+    assert component.calls == 2
+
+
+class Basket:
+    template_path = Path(__file__).name
+    items = ("a", "b")
+
+    @property
+    def count(self):
+        return len(self.items)
+
+    @computed
+    def label(self):
+        return f"{self.count} items"
+
+
+def test_computed_through_property():
+    component = ComponentProxy(Basket())
+    assert component.label == "2 items"
+    component.items = ("a", "b", "c")
+    assert component.label == "3 items"
+
+
+def test_computed_read_only():
+    component = ComponentProxy(Cart())
+    with pytest.raises(AttributeError):
+        component.total = 1
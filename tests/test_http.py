@@ -7,10 +7,6 @@ from common.handlers import (
 )
 
 
-# All test coroutines will be treated as marked.
-pytestmark = pytest.mark.asyncio
-
-
 def test_register_get(mt):
     mt.get("/")(handle_ok)
     assert mt.http_routes[1].path == "/"
@@ -19,6 +15,7 @@ def test_register_get(mt):
 
 
 @pytest.mark.parametrize("action", HTTP_CONSTs.actions)
+@pytest.mark.asyncio
 async def test_register_action_direct_hello(action, mt, aiohttp_client):
     handler_registerer = getattr(
         mt.http_server.router,
@@ -35,6 +32,7 @@ async def test_register_action_direct_hello(action, mt, aiohttp_client):
 
 
 @pytest.mark.parametrize("action", HTTP_CONSTs.actions)
+@pytest.mark.asyncio
 async def test_register_http_action_hello(action, mt, aiohttp_client):
     handler_registerer = getattr(mt, action)
     handler_registerer("/")(handle_ok)
@@ -49,6 +47,7 @@ async def test_register_http_action_hello(action, mt, aiohttp_client):
 
 
 @pytest.mark.parametrize("action", HTTP_CONSTs.actions)
+@pytest.mark.asyncio
 async def test_register_wrong_action_hello(action, mt, aiohttp_client):
     registered_action = "post" if action == "get" else "get"
     handler_registerer = getattr(mt, registered_action)
@@ -64,6 +63,7 @@ async def test_register_wrong_action_hello(action, mt, aiohttp_client):
 
 
 @pytest.mark.parametrize("action", ["get"])
+@pytest.mark.asyncio
 async def test_register_action_get_template(action, mt, aiohttp_client):
     handler_registerer = getattr(
         mt.http_server.router,
@@ -80,6 +80,7 @@ async def test_register_action_get_template(action, mt, aiohttp_client):
 
 
 @pytest.mark.parametrize("action", ["get", "post"])
+@pytest.mark.asyncio
 async def test_register_action_get_template(action, mt, aiohttp_client):
     handler_registerer = getattr(
         mt.http_server.router,
@@ -0,0 +1,59 @@
+import queue
+import logging
+
+from meltree.logs import LazyQueueHandler, RateLimiter, SampleFilter, sample_logger
+
+
+def test_sample_filter():
+    record = logging.makeLogRecord({})
+    sample = SampleFilter(3)
+    assert [sample.filter(record) for _ in range(6)] == [1, 0, 0, 1, 0, 0]
+
+
+def test_sample_logger_replaces_filter():
+    logger = logging.getLogger("meltree.test.sampled")
+    sample_logger(logger, 3)
+    sample = sample_logger(logger, 2)
+    assert logger.filters == [sample]
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(interval=60)
+    assert limiter("a") == 0
+    assert limiter("a") is None
+    assert limiter("a") is None
+    assert limiter("b") == 0
+
+    limiter.interval = 0
+    assert limiter("a") == 2
+
+
+def test_lazy_queue_handler_keeps_args():
+    record = logging.makeLogRecord({"msg": "value %s", "args": (1,)})
+    assert LazyQueueHandler(None).prepare(record).args == (1,)
+
+
+def test_component_miss_rate_limited(mt, caplog):
+    with caplog.at_level(logging.ERROR):
+        for _ in range(3):
+            assert mt.get_component("Missing:1") is None
+    assert len(caplog.records) == 1
+
+
+def test_root_handlers_configured_later(monkeypatch):
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    records = []
+    handler = LazyQueueHandler(queue.SimpleQueue(), defer_to_root=True)
+    logger = logging.getLogger("test_logs.later")
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    logger.error("queued")
+    assert handler.queue.get_nowait().msg == "queued"
+
+    root_handler = logging.Handler()
+    root_handler.emit = records.append
+    logging.getLogger().addHandler(root_handler)
+    logger.error("to root")
+    assert [r.msg for r in records] == ["to root"]
+    assert handler.queue.empty()
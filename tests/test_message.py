@@ -0,0 +1,146 @@
+import pytest
+import re
+from pathlib import Path
+
+from meltree import inline
+from meltree.component import ComponentProxy
+from meltree.message import parse_call_method_name, process_message
+
+
+class Counter:
+    template_path = Path(__file__).name
+    value = 0
+
+    def add(self, step):
+        self.value += step
+
+    @inline
+    def add_inline(self, step):
+        self.value += step
+
+    async def reset(self):
+        self.value = 0
+
+
+def call_message(component, *names):
+    return {
+        "id": component.cid,
+        "componentName": "Counter",
+        "actionQueue": [
+            {"type": "callMethod", "payload": {"name": name}} for name in names
+        ],
+        "data": {},
+    }
+
+
+@pytest.mark.parametrize(
+    "call, expected",
+    [
+        ("reset", ("reset", None)),
+        ("reset()", ("reset", None)),
+        ("add('7')", ("add", ("7",))),
+        ("add(-3)", ("add", (-3,))),
+        ("add('a', 1.5)", ("add", ("a", 1.5))),
+        ("add(a, b)", ("add", ("a", "b"))),
+    ],
+)
+def test_parse_call_method_name(call, expected):
+    assert parse_call_method_name(call) == expected
+
+
+def test_parse_call_method_name_copies_mutable():
+    _, first = parse_call_method_name("add([1])")
+    first[0].append(2)
+    _, second = parse_call_method_name("add([1])")
+    assert second == ([1],)
+
+
+@pytest.mark.asyncio
+async def test_process_message_dispatch():
+    component = ComponentProxy(Counter())
+    message = call_message(component, "add(2)", "add_inline(3)")
+    res = await process_message(component, message)
+    assert component.value == 5
+    assert res["id"] == component.cid
+
+    await process_message(component, call_message(component, "reset()"))
+    assert component.value == 0
+
+
+@pytest.mark.asyncio
+async def test_process_message_arity():
+    component = ComponentProxy(Counter())
+    with pytest.raises(TypeError):
+        await process_message(component, call_message(component, "add_inline(1, 2)"))
+
+
+class Profile:
+    template_path = "progress_bar.html"
+    progress = 0
+    draft = ""
+
+
+def sync_message(component, name, value, version, digest=None):
+    return {
+        "id": component.cid,
+        "componentName": "Profile",
+        "actionQueue": [
+            {"type": "syncInput", "payload": {"name": name, "value": value}}
+        ],
+        "data": {},
+        "renderDOM": True,
+        "version": version,
+        "digest": digest,
+    }
+
+
+def shown_digest(html):
+    return re.search(r'meld:digest="(\w+)"', html).group(1)
+
+
+@pytest.mark.asyncio
+async def test_process_message_optimistic_sync():
+    component = ComponentProxy(Profile())
+    digest = shown_digest(component.render())
+
+    message = sync_message(component, "draft", "a", 1, digest)
+    res = await process_message(component, message)
+    assert res["version"] == 1
+    assert "dom" not in res
+    assert component.draft == "a"
+
+    message = sync_message(component, "progress", 5, 2, digest)
+    res = await process_message(component, message)
+    assert res["version"] == 2
+    assert "5% done" in res["dom"]
+
+    # the client dropped that response as stale and still shows the first
+    # render, so the next sync gets the dom again
+    message = sync_message(component, "draft", "ab", 3, digest)
+    res = await process_message(component, message)
+    assert "5% done" in res["dom"]
+    # once it shows the new output, syncs leaving it unchanged skip the dom
+    message = sync_message(component, "draft", "abc", 4, shown_digest(res["dom"]))
+    assert "dom" not in await process_message(component, message)
+
+    # clients without versions always get the dom
+    message = sync_message(component, "draft", "b", None)
+    del message["version"]
+    res = await process_message(component, message)
+    assert "version" not in res
+    assert "dom" in res
+
+
+@pytest.mark.asyncio
+async def test_response_per_client(mt, emitted):
+    component = mt.get_component(mt.register_component(Profile()))
+    digest = shown_digest(component.render())
+    handler = mt.sio_server.handlers["/"]["meld-message"]
+
+    await handler("s1", sync_message(component, "draft", "a", 1, digest))
+    (own, own_to), (other, other_to) = [(data, to) for _, data, to in emitted]
+    # the sender already shows the dom
+    assert own_to == "s1" and own["version"] == 1 and "dom" not in own
+    # the other clients don't share its version, and get the dom
+    assert other_to is None and emitted.skipped == [None, "s1"]
+    assert "version" not in other and "meld:digest" in other["dom"]
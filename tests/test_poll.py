@@ -0,0 +1,132 @@
+import pytest
+import asyncio
+
+from meltree import background, poll
+from meltree.poll import Poller
+
+
+class Clock:
+    template_path = "progress_bar.html"
+    progress = 0
+
+    @poll(1)
+    def tick(self):
+        self.progress += 1
+
+
+class Gauge:
+    template_path = "progress_bar.html"
+    progress = 50
+
+    @poll(1)
+    async def refresh(self):
+        self.progress += 10
+
+
+class Fast:
+    template_path = "progress_bar.html"
+    progress = 0
+
+    @poll(0.01)
+    def tick(self):
+        self.progress += 1
+
+
+@pytest.mark.asyncio
+async def test_poll_frames(mt, emitted):
+    clock = mt.register_component(Clock(), cid="clock")
+    gauge = mt.register_component(Gauge(), cid="gauge")
+    # a long resolution keeps the wheel from turning on its own
+    poller = Poller(mt, resolution=60)
+    poller.set_session("s1", [clock, gauge], True)
+    poller.set_session("s2", [gauge], True)
+
+    poller.tick += 1
+    await poller.turn()
+    assert mt.get_component(clock).progress == 1
+    assert mt.get_component(gauge).progress == 60
+    frames = {to: [u["id"] for u in data] for event, data, to in emitted}
+    assert sorted(frames["s1"]) == [clock, gauge]
+    assert frames["s2"] == [gauge]
+    assert poller.last_tick["calls"] == 2 and poller.last_tick["frames"] == 2
+
+    # hidden clients pause polling of the components only they show
+    emitted.clear()
+    poller.set_session("s1", [clock, gauge], False)
+    poller.tick += 1
+    await poller.turn()
+    assert mt.get_component(clock).progress == 1
+    assert [to for _, _, to in emitted] == ["s2"]
+    assert poller.last_tick["paused"] == 1
+
+    poller.set_session("s1", [clock, gauge], True)
+    poller.tick += 1
+    await poller.turn()
+    assert mt.get_component(clock).progress == 2
+    await poller.close()
+
+
+@pytest.mark.asyncio
+async def test_poll_catch_up_and_stop(mt, emitted):
+    clock = mt.register_component(Clock(), cid="clock")
+    poller = Poller(mt, resolution=60)
+    poller.set_session("s1", [clock], True)
+
+    # five ticks skipped while the loop was busy: the method runs once
+    since = poller.tick
+    poller.tick += 5
+    await poller.turn(since=since)
+    assert mt.get_component(clock).progress == 1
+    await poller.close()
+
+    # the wheel stops once nothing is polled
+    fast = mt.register_component(Fast(), cid="fast")
+    poller = Poller(mt, resolution=0.01)
+    poller.set_session("s1", [fast], True)
+    await asyncio.sleep(0.05)
+    assert mt.get_component(fast).progress > 0
+    poller.set_session("s1", [fast], False)
+    await asyncio.sleep(0.05)
+    assert poller._task is None
+    await poller.close()
+
+
+@pytest.mark.asyncio
+async def test_poll_entries_dropped(mt, emitted):
+    clock = mt.register_component(Clock(), cid="clock")
+    poller = Poller(mt, resolution=60)
+    poller.set_session("s1", [clock], True)
+    poller.forget("s1")
+    assert poller._entries == {}
+
+    # shown again before the dropped entry was due: polled once per tick
+    poller.set_session("s2", [clock], True)
+    poller.tick += 1
+    await poller.turn()
+    assert mt.get_component(clock).progress == 1
+    await poller.close()
+
+
+class Report:
+    template_path = "progress_bar.html"
+    progress = 0
+
+    @poll(1)
+    @background
+    async def build(self):
+        self.progress = 100
+
+
+@pytest.mark.asyncio
+async def test_poll_background(mt, emitted):
+    report = mt.register_component(Report(), cid="report")
+    poller = Poller(mt, resolution=60)
+    poller.set_session("s1", [report], True)
+    poller.tick += 1
+    await poller.turn()
+    while mt.tasks.status()["running"]:
+        await asyncio.sleep(0)
+    assert mt.get_component(report).progress == 100
+    # a task of the scheduler, which sends the component when it is done
+    assert sorted(event for event, _, _ in emitted) == ["meld-frame", "meld-response"]
+    await poller.close()
@@ -0,0 +1,107 @@
+import os
+import signal
+import pstats
+import asyncio
+import pytest
+
+from meltree.component import ComponentProxy
+from meltree.message import process_message
+from meltree.profiler import ComponentProfiler, profiler
+from common.components import Calculator
+
+
+def press(component, btn):
+    return {
+        "id": component.cid,
+        "componentName": "Calculator",
+        "actionQueue": [
+            {"type": "callMethod", "payload": {"name": f"btn_pressed('{btn}')"}}
+        ],
+        "data": {},
+        "renderDOM": True,
+    }
+
+
+def test_profiler_inactive_is_noop():
+    local = ComponentProfiler()
+    assert local.section(Calculator(), "render_template") is local.section(None, "x")
+    assert local.stop() is None
+
+
+def test_profiler_duration(tmp_path):
+    local = ComponentProfiler(output_dir=tmp_path)
+    local.start(duration=0.05)
+    timer = local._timer
+    timer.join()
+    assert local.status()["active"] is False
+    # the dump written when the window closed is returned once
+    path = local.stop()
+    assert path is not None and os.path.exists(path)
+    assert local.stop() is None
+
+
+@pytest.mark.asyncio
+async def test_profile_component(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "output_dir", tmp_path)
+    component = ComponentProxy(Calculator())
+    profiler.start(classes=["Calculator"], sections=["btn_pressed", "soup"])
+    try:
+        await process_message(component, press(component, "7"))
+    finally:
+        path = profiler.stop()
+
+    functions = {func for _, _, func in pstats.Stats(path).stats}
+    assert "btn_pressed" in functions
+    assert "_desoupify" in functions
+    assert "_render_template" not in functions
+
+
+@pytest.mark.asyncio
+async def test_profiler_route(mt, aiohttp_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "output_dir", tmp_path)
+    mt.add_profiler_route()
+    mt.http_server.add_routes(mt.http_routes)
+    cli = await aiohttp_client(mt.http_server)
+
+    resp = await cli.post("/_meltree/profiler?mode=sampling&duration=30")
+    assert (await resp.json())["mode"] == "sampling"
+    resp = await cli.post("/_meltree/profiler")
+    assert resp.status == 400
+
+    resp = await cli.delete("/_meltree/profiler")
+    assert resp.status == 200
+    resp = await cli.delete("/_meltree/profiler")
+    assert resp.status == 409
+    await cli.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_profile(tmp_path, monkeypatch):
+    local = ComponentProfiler(output_dir=tmp_path)
+    monkeypatch.setattr(local, "shared_profile", True)
+    component = ComponentProxy(Calculator())
+    local.start()
+    with local.section(component, "outer"):
+        await asyncio.get_running_loop().run_in_executor(
+            None, local.wrap(component, "render", component.render)
+        )
+    assert local._open == 0
+    functions = {func for _, _, func in pstats.Stats(local.stop()).stats}
+    assert "run_in_executor" in functions
+
+
+@pytest.mark.asyncio
+async def test_profiler_signal(mt, aiohttp_client, monkeypatch, tmp_path):
+    with pytest.raises(ValueError):
+        mt.add_profiler_signal(None)
+
+    monkeypatch.setattr(profiler, "output_dir", tmp_path)
+    mt.add_profiler_signal(signal.SIGUSR1)
+    cli = await aiohttp_client(mt.http_server)
+    os.kill(os.getpid(), signal.SIGUSR1)
+    await asyncio.sleep(0.01)
+    assert profiler.active
+    os.kill(os.getpid(), signal.SIGUSR1)
+    while profiler.active or not list(tmp_path.iterdir()):
+        await asyncio.sleep(0.01)
+    await cli.close()
@@ -0,0 +1,36 @@
+from meltree.component import ComponentProxy
+from common.components import Calculator
+
+
+def test_register_instance(mt):
+    calc = Calculator()
+    cid = mt.register_component(calc, cid="main")
+    assert cid == "Calculator:main"
+    assert list(mt._components) == [cid]
+
+    component = mt.get_component(cid)
+    assert component.__wrapped__ is calc
+    assert mt.get_component(id(calc)) is component
+    assert vars(calc) == {}
+
+
+def test_register_lazy(mt):
+    created = []
+
+    def make_calculator():
+        created.append(Calculator())
+        return created[-1]
+
+    class_cid = mt.register_component(Calculator, cid="lazy")
+    factory_cid = mt.register_component(make_calculator)
+    assert mt._components[class_cid] is Calculator
+    assert created == []
+
+    component = mt.get_component(factory_cid)
+    assert isinstance(component, ComponentProxy)
+    assert component.__wrapped__ is created[0]
+    assert component.cid == factory_cid
+    assert mt.get_component(factory_cid) is component
+    assert mt.get_component(id(created[0])) is component
+
+    assert mt.get_component(class_cid).cid == "Calculator:lazy"
@@ -0,0 +1,57 @@
+import pytest
+from meltree import MelTree
+from meltree.recorder import read_trace
+from meltree.replay import compare, replay, summarize
+from common.components import Calculator
+
+
+def make_app(**kwargs):
+    mt = MelTree.func(**kwargs)
+    mt.register_component(Calculator(), cid="main")
+
+    async def emit(*args, **kwargs):
+        pass
+
+    mt.sio_server.emit = emit
+    return mt
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(tmp_path):
+    trace_path = tmp_path / "trace.log"
+    mt = make_app(record_path=trace_path)
+    handlers = mt.sio_server.handlers["/"]
+    await handlers["meld-init"]("sid1", "Calculator:main")
+    for btn in "12+3=":
+        message = {
+            "id": "Calculator:main",
+            "componentName": "Calculator",
+            "actionQueue": [
+                {"type": "callMethod", "payload": {"name": f"btn_pressed('{btn}')"}}
+            ],
+            "data": {},
+            "renderDOM": True,
+        }
+        await handlers["meld-message"]("sid1", message)
+    await handlers["meld-init"]("sid1", "Calculator:unknown")
+    # written and flushed before the recorder is closed
+    mt._recorder.flush()
+
+    trace = read_trace(trace_path)
+    mt._recorder.close()
+    assert [record[1] for record in trace] == ["meld-init"] + ["meld-message"] * 5 + [
+        "meld-init"
+    ]
+
+    fresh = make_app()
+    results = await replay(fresh, trace)
+    assert fresh.get_component("Calculator:main").result == "15"
+    assert results[-1]["missing"]
+    assert all(r["render_ms"] > 0 for r in results[1:-1])
+    # replayed through the handlers of live traffic
+    assert fresh.admission.stats()["admitted"] == {"init": 1, "click": 5}
+
+    summary = summarize(results)
+    assert summary["messages"] == 6
+    assert summary["size_total"] > 0
+    assert compare(summary, summary)["size_total"] == 0
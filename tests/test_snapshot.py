@@ -0,0 +1,77 @@
+from meltree.component import ComponentProxy
+from meltree.snapshot import SnapshotStore
+from common.components import Calculator
+
+
+def make_component(cid="main"):
+    component = ComponentProxy(Calculator())
+    component.cid = f"Calculator:{cid}"
+    return component
+
+
+def test_snapshot_roundtrip(tmp_path):
+    path = tmp_path / "state.snap"
+    store = SnapshotStore(path)
+    component = make_component()
+    component.btn_pressed("7")
+    store.save(component).result()
+    assert store.save(component).result() is False  # unchanged
+    store.close()
+
+    store = SnapshotStore(path)
+    restored = make_component()
+    assert restored.expression == ""
+    assert store.restore(restored)
+    assert restored.expression == "7"
+    assert not store.restore(restored)
+    assert not store.restore(make_component("other"))
+
+
+def test_snapshot_compacted_on_close(tmp_path):
+    path = tmp_path / "state.snap"
+    store = SnapshotStore(path)
+    component = make_component()
+    for btn in "123":
+        component.btn_pressed(btn)
+        store.save(component)
+    store.close()
+
+    store = SnapshotStore(path)
+    assert store._records == 1
+    restored = make_component()
+    store.restore(restored)
+    assert restored.expression == "123"
+
+
+def test_snapshot_compacted_on_open(tmp_path):
+    path = tmp_path / "state.snap"
+    store = SnapshotStore(path)
+    component = make_component()
+    for btn in "123":
+        component.btn_pressed(btn)
+        store.save(component).result()
+    # not closed, e.g. the process was killed
+    store._executor.shutdown()
+
+    store = SnapshotStore(path)
+    assert store._records == 1
+
+
+def test_snapshot_long_cid(tmp_path):
+    store = SnapshotStore(tmp_path / "state.snap")
+    assert store.save(make_component("x" * 0x10000)) is None
+    store.close()
+
+
+def test_snapshot_truncated_record(tmp_path):
+    path = tmp_path / "state.snap"
+    store = SnapshotStore(path)
+    store.save(make_component()).result()
+    store.close()
+    size = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(b"\x05\x00")  # interrupted write
+
+    store = SnapshotStore(path)
+    assert store._records == 1
+    assert path.stat().st_size == size
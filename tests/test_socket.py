@@ -0,0 +1,142 @@
+import pytest
+from html import unescape
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+from meltree import MelTree, MelTreeServer
+from common.components import Calculator
+
+
+def test_websocket_only_options():
+    mt = MelTree.func(transports=["websocket"], ping_interval=60)
+    assert mt.sio_server.eio.transports == ["websocket"]
+    assert mt.sio_server.eio.ping_interval == 60
+    assert '"upgrade": false' in unescape(mt.client_options())
+
+
+def test_options_of_existing_app(mt):
+    assert MelTree() is mt
+    with pytest.raises(ValueError):
+        MelTree(transports=["websocket"])
+
+
+@pytest.mark.asyncio
+async def test_session_resume(mt, emitted):
+    connect = mt.sio_server.handlers["/"]["connect"]
+    disconnect = mt.sio_server.handlers["/"]["disconnect"]
+
+    await connect("sid1", {}, None)
+    token = emitted[-1][1]["token"]
+    assert emitted[-1] == ("meld-session", {"token": token, "resumed": False}, "sid1")
+
+    # a duplicated tab sends the token of a connected session
+    await connect("tab", {}, {"token": token})
+    assert emitted[-1][1]["token"] != token
+    assert emitted[-1][1]["resumed"] is False
+
+    await disconnect("sid1")
+    await connect("sid2", {}, {"token": token})
+    assert emitted[-1] == ("meld-session", {"token": token, "resumed": True}, "sid2")
+    assert mt._session_tokens["sid2"] == token
+
+
+@pytest.mark.asyncio
+async def test_session_expiry(mt, emitted):
+    connect = mt.sio_server.handlers["/"]["connect"]
+    disconnect = mt.sio_server.handlers["/"]["disconnect"]
+    mt.session_grace = 0
+    for i in range(100):
+        await connect(f"sid{i}", {}, None)
+        await disconnect(f"sid{i}")
+    assert len(mt._sessions) <= 1
+    assert mt._session_tokens == {}
+
+    token = emitted[-1][1]["token"]
+    await connect("late", {}, {"token": token})
+    assert emitted[-1][1]["resumed"] is False
+
+
+@pytest.mark.asyncio
+async def test_shared_server(app_cache, aiohttp_client):
+    server = MelTreeServer()
+    tools = server.app("tools")
+    notes = server.app("notes")
+    assert server.app("tools") is tools is MelTree("tools")
+    assert tools.sio_server is notes.sio_server is server.sio_server
+    assert (tools.namespace, notes.namespace) == ("/tools", "/notes")
+    assert set(server.sio_server.handlers) == {"/tools", "/notes"}
+    tools.register_component(Calculator, cid="main")
+    assert list(tools._components) == ["Calculator:main"]
+    assert notes._components == {}
+
+    @tools.get("/")
+    async def index(request):
+        return web.Response(text="tools")
+
+    cli = await aiohttp_client(server.setup())
+    resp = await cli.get("/tools/")
+    assert await resp.text() == "tools"
+    resp = await cli.get("/meltree_static/meld.js")
+    assert resp.status == 200
+    await cli.close()
+
+
+@pytest.mark.asyncio
+async def test_navigate(mt):
+    @mt.get("/page")
+    async def page(request):
+        return web.Response(
+            text=f"<div meld:page>{request.headers['X-Tab']}</div>",
+            content_type="text/html",
+        )
+
+    @mt.get("/old")
+    async def old(request):
+        raise web.HTTPFound("/page")
+
+    mt.http_server.add_routes(mt.http_routes)
+    origin = make_mocked_request("GET", "/", headers={"X-Tab": "a"}, app=mt.http_server)
+    mt.sio_server.get_environ = lambda sid, namespace=None: {"aiohttp.request": origin}
+    navigate = mt.sio_server.handlers["/"]["meld-navigate"]
+
+    assert await navigate("sid", "/page") == {
+        "status": 200,
+        "html": "<div meld:page>a</div>",
+    }
+    assert await navigate("sid", "/old") == {"status": 302, "redirect": "/page"}
+    assert await navigate("sid", "/missing") == {"status": 404}
+
+
+@pytest.mark.asyncio
+async def test_navigate_middlewares(mt):
+    @web.middleware
+    async def auth(request, handler):
+        if request.headers.get("X-Auth") != "secret":
+            raise web.HTTPForbidden()
+        return await handler(request)
+
+    @mt.get("/private")
+    async def private(request):
+        return web.Response(
+            text="<div meld:page>secret</div>", content_type="text/html"
+        )
+
+    mt.http_server.middlewares.append(auth)
+    mt.http_server.add_routes(mt.http_routes)
+    # middlewares are set up when the server starts
+    mt.http_server.freeze()
+    origin = make_mocked_request("GET", "/", app=mt.http_server)
+    mt.sio_server.get_environ = lambda sid, namespace=None: {"aiohttp.request": origin}
+    navigate = mt.sio_server.handlers["/"]["meld-navigate"]
+
+    assert await navigate("sid", "/private") == {"status": 403}
+
+
+@pytest.mark.asyncio
+async def test_navigate_without_app_handler(mt, monkeypatch):
+    origin = make_mocked_request("GET", "/", app=mt.http_server)
+    monkeypatch.delattr(web.Application, "_handle")
+    mt.sio_server.get_environ = lambda sid, namespace=None: {"aiohttp.request": origin}
+    navigate = mt.sio_server.handlers["/"]["meld-navigate"]
+
+    # the client falls back to a full navigation
+    assert await navigate("sid", "/page") == {"status": None}
@@ -0,0 +1,48 @@
+import pytest
+
+from meltree.startup import StartupTimeline, bind_socket, READY_PATH, SPLASH_PATH
+
+
+def test_bind_ephemeral_port():
+    sock = bind_socket("127.0.0.1", 0)
+    try:
+        assert sock.getsockname()[1] > 0
+    finally:
+        sock.close()
+
+
+def test_timeline():
+    now = [0.0]
+    timeline = StartupTimeline(clock=lambda: now[0])
+    now[0] = 0.002
+    timeline.mark("socket bound")
+    now[0] = 0.05
+    assert timeline.mark("first client connected", once=True) == 0.05
+    assert timeline.mark("first client connected", once=True) is None
+    assert timeline.summary() == {"socket bound": 2.0, "first client connected": 50.0}
+
+
+@pytest.mark.asyncio
+async def test_ready_after_prewarm(mt, aiohttp_client):
+    class Counter:
+        def increment(self):
+            pass
+
+    cid = mt.register_component(Counter)
+    sock = mt.prepare(host="127.0.0.1", port=0)
+    sock.close()
+    with pytest.raises(RuntimeError):
+        mt.prepare(host="127.0.0.1", port=0)
+    cli = await aiohttp_client(mt.http_server)
+
+    resp = await cli.get(SPLASH_PATH)
+    assert READY_PATH in await resp.text()
+
+    resp = await cli.get(READY_PATH)
+    assert resp.status == 200
+    summary = await resp.json()
+    assert "ready" in summary
+    assert any(label.endswith("templates compiled") for label in summary)
+    # lazy components stay unconstructed
+    assert mt._components[cid] is Counter
+    await cli.close()
@@ -0,0 +1,93 @@
+import pytest
+import asyncio
+
+from meltree import MelTreeServer, shared
+from meltree.store import Store
+
+
+class Bar:
+    template_path = "progress_bar.html"
+    progress = shared(default=0)
+    label = "bar"
+
+    def advance(self):
+        self.progress += 10
+
+
+class Gauge:
+    template_path = "progress_bar.html"
+    progress = shared("progress", default=0)
+
+
+class Idle:
+    template_path = "progress_bar.html"
+    progress = shared("idle", default=5)
+
+
+def test_versions():
+    changes = []
+    store = Store(on_change=lambda key, version: changes.append((key, version)))
+    assert store.version("items") == 0
+    assert store.encoded("items") == (0, "null")
+
+    assert store.set("items", [1, 2]) == 1
+    assert store.set("items", [1, 2, 3]) == 2
+    assert store.get("items") == [1, 2, 3]
+    assert store.encoded("items") == (2, "[1,2,3]")
+    assert changes == [("items", 1), ("items", 2)]
+
+
+@pytest.mark.asyncio
+async def test_publish_once_per_version(mt, emitted):
+    bar = mt.register_component(Bar(), cid="bar")
+    gauge = mt.register_component(Gauge(), cid="gauge")
+    idle = mt.register_component(Idle(), cid="idle")
+    for cid in (bar, gauge, idle):
+        mt.get_component(cid).render()
+
+    component = mt.get_component(bar)
+    assert "progress" not in component._attributes()
+    assert mt.get_component(idle).progress == 5
+
+    component.advance()
+    # the change is published by a task
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert emitted[0] == (
+        "meld-store",
+        {"key": "progress", "version": 1, "value": "10"},
+        "meld-store:progress",
+    )
+    # each component goes only to the clients showing it
+    responses = [(data["id"], to) for event, data, to in emitted[1:]]
+    assert sorted(responses) == [
+        (bar, f"meld-component:{bar}"),
+        (gauge, f"meld-component:{gauge}"),
+    ]
+    assert mt.get_component(gauge).progress == 10
+
+    # nothing is sent again for a version already published
+    emitted.clear()
+    await mt.publish_shared("progress")
+    assert emitted == []
+
+    # a new version rendering the same html only sends the value
+    mt.store.set("progress", 10)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert [event for event, data, to in emitted] == ["meld-store"]
+
+
+def test_store_of_registering_app(app_cache):
+    tools = MelTreeServer().app("tools")
+    bar = Bar()
+    with pytest.raises(AttributeError):
+        bar.progress = 1
+    assert bar.progress == 0
+
+    cid = tools.register_component(bar)
+    tools.get_component(cid).progress = 20
+    assert tools.store.get("progress") == 20
+    assert tools.store.subscribers("progress") == [cid]
+    # no default app is built by reading or setting the attribute
+    assert list(app_cache) == ["tools"]
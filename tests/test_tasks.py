@@ -0,0 +1,143 @@
+import pytest
+import asyncio
+from pathlib import Path
+
+from meltree import background
+from meltree.component import ComponentProxy
+from meltree.message import process_message
+from meltree.tasks import TaskScheduler, BATCH, INTERACTIVE
+
+
+@pytest.mark.asyncio
+async def test_limit_and_priority():
+    tasks = TaskScheduler(limit=1)
+    started = []
+    release = asyncio.Event()
+
+    async def job(name):
+        started.append(name)
+        await release.wait()
+        return name
+
+    first = tasks.submit(job, ("first",), key="Chart")
+    batch = tasks.submit(job, ("batch",), key="Chart", priority=BATCH)
+    interactive = tasks.submit(job, ("interactive",), key="Chart")
+    other = tasks.submit(job, ("other",), key="Table")
+    await asyncio.sleep(0)
+
+    assert started == ["first", "other"]
+    status = tasks.status()
+    assert [t["key"] for t in status["queued"]] == ["Chart", "Chart"]
+    assert [t["priority"] for t in status["queued"]] == ["interactive", "batch"]
+
+    release.set()
+    assert await asyncio.gather(first, batch, interactive, other) == [
+        "first",
+        "batch",
+        "interactive",
+        "other",
+    ]
+    assert started == ["first", "other", "interactive", "batch"]
+    assert tasks.status() == {"running": [], "queued": []}
+
+
+@pytest.mark.asyncio
+async def test_cancel_session():
+    tasks = TaskScheduler(limit=1)
+
+    running = tasks.submit(asyncio.sleep, (10,), sid="a")
+    queued = tasks.submit(asyncio.sleep, (10,), sid="a")
+    kept = tasks.submit(asyncio.sleep, (0,), key="other", sid="b")
+    await asyncio.sleep(0)
+
+    assert tasks.cancel_session("a") == 2
+    await asyncio.gather(running, queued, return_exceptions=True)
+    assert running.cancelled() and queued.cancelled()
+    await kept
+    assert tasks.status() == {"running": [], "queued": []}
+
+
+@pytest.mark.asyncio
+async def test_submit_from_thread():
+    tasks = TaskScheduler()
+    tasks.bind(asyncio.get_running_loop())
+
+    def submit():
+        return tasks.submit(lambda: 42).result(timeout=5)
+
+    assert await asyncio.to_thread(submit) == 42
+
+
+@pytest.mark.asyncio
+async def test_shutdown():
+    tasks = TaskScheduler()
+    future = tasks.submit(asyncio.sleep, (10,))
+    await asyncio.sleep(0)
+    await tasks.shutdown()
+    assert future.cancelled()
+    assert tasks.submit(asyncio.sleep, (0,)).cancelled()
+
+
+class Job:
+    template_path = "progress_bar.html"
+    progress = 0
+
+    @background
+    async def run(self):
+        self.progress = 100
+
+
+@pytest.mark.asyncio
+async def test_background_method(mt, emitted):
+    component = mt.get_component(mt.register_component(Job()))
+    message = {
+        "id": component.cid,
+        "componentName": "Job",
+        "actionQueue": [{"type": "callMethod", "payload": {"name": "run"}}],
+        "data": {},
+    }
+    await process_message(component, message, mt.tasks, "sid")
+    (task,) = mt.tasks.status()["running"]
+    assert task["name"] == "Job.run" and task["sid"] == "sid"
+
+    while mt.tasks.status()["running"]:
+        await asyncio.sleep(0)
+    assert component.progress == 100
+    event, data, _ = emitted[-1]
+    assert event == "meld-response" and "100% done" in data["dom"]
+
+
+@pytest.mark.asyncio
+async def test_emit(mt, emitted):
+    await mt.emit("progress", progress=5)
+    assert emitted == [
+        ("meld-event", {"event": "progress", "message": {"progress": 5}}, None)
+    ]
+    assert emitted.namespaces == ["/"]
+
+
+@pytest.mark.asyncio
+async def test_failed_background_future_retrieved():
+    tasks = TaskScheduler()
+
+    async def fail():
+        raise ValueError("boom")
+
+    future = tasks.submit(fail)
+    while not future.done():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert not future._log_traceback
+
+
+@pytest.mark.asyncio
+async def test_emit_from_thread_before_startup(mt, emitted):
+    future = await asyncio.to_thread(mt.emit, "progress", progress=5)
+    assert not future.done() and emitted == []
+
+    await mt.on_startup(mt.http_server)
+    await asyncio.wrap_future(future)
+    assert emitted == [
+        ("meld-event", {"event": "progress", "message": {"progress": 5}}, None)
+    ]
+    assert mt.tasks.limits["emit"] > mt.tasks.limit